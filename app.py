@@ -1,24 +1,109 @@
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_file, stream_with_context
+import json
 import os
+import time
 from dotenv import load_dotenv
 from modules.news_scraper import fetch_trending_news
-from modules.script_generator import generate_script
-from modules.scene_analyzer import analyze_scenes
-from modules.media_fetcher import fetch_media
-from modules.video_assembler import create_video
-import json
-from datetime import datetime
+from modules.news_cache import NewsCache
+from modules.job_queue import JobQueue, QueueFullError
+from modules.progress import ProgressBus
+from modules.metrics import render_metrics
+from modules.pipeline import run_pipeline
+from modules.render_profiles import PROFILE_ORDER, RENDER_PROFILES, default_profile_name
+from modules.coalescing import job_key, request_key
+from modules.prewarm import Prewarmer
+from modules.metrics import PREWARM_JOBS_TOTAL
+from modules.admission import get_admission_controller
+from modules.preview import PREVIEW_KINDS
+from modules.media_cache import get_media_cache
+from modules.scene_cache import get_scene_cache
+from modules.llm_cache import get_llm_cache
+from modules.tts import get_tts_cache
 
 load_dotenv()
 
 app = Flask(__name__)
 app.config['OUTPUT_FOLDER'] = 'outputs'
 app.config['TEMP_FOLDER'] = 'temp'
+# Number of renders running at once and how many jobs may wait behind them
+app.config['RENDER_WORKERS'] = int(os.getenv('RENDER_WORKERS', 2))
+app.config['JOB_QUEUE_SIZE'] = int(os.getenv('JOB_QUEUE_SIZE', 8))
+# How long a finished video is handed to identical requests instead of rendering again
+app.config['JOB_RESULT_TTL'] = int(os.getenv('JOB_RESULT_TTL', 300))
+# Trending feed snapshot lifetime and optional file shared between processes
+app.config['NEWS_CACHE_TTL'] = int(os.getenv('NEWS_CACHE_TTL', 300))
+app.config['NEWS_CACHE_FILE'] = os.getenv('NEWS_CACHE_FILE') or None
+# Speculative generation of the top trending articles after each feed refresh
+app.config['PREWARM_TOP_K'] = int(os.getenv('PREWARM_TOP_K', 3))
+app.config['PREWARM_MODE'] = os.getenv('PREWARM_MODE', 'storyboard')
+app.config['PREWARM_PROFILE'] = os.getenv('PREWARM_PROFILE') or None
+app.config['PREWARM_BUDGET'] = int(os.getenv('PREWARM_BUDGET', 10))
+app.config['PREWARM_MAX_LOAD'] = float(os.getenv('PREWARM_MAX_LOAD', 0.75))
 
 # Create necessary folders
 os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
 os.makedirs(app.config['TEMP_FOLDER'], exist_ok=True)
 
+progress_bus = ProgressBus()
+
+job_queue = JobQueue(
+    lambda job: run_pipeline(job, app.config['OUTPUT_FOLDER'], app.config['TEMP_FOLDER']),
+    workers=app.config['RENDER_WORKERS'],
+    max_queue=app.config['JOB_QUEUE_SIZE'],
+    bus=progress_bus,
+    result_ttl=app.config['JOB_RESULT_TTL']
+)
+
+news_cache = NewsCache(
+    lambda: fetch_trending_news(limit=10),
+    ttl=app.config['NEWS_CACHE_TTL'],
+    snapshot_path=app.config['NEWS_CACHE_FILE']
+)
+
+prewarmer = Prewarmer(
+    job_queue,
+    top_k=app.config['PREWARM_TOP_K'],
+    mode=app.config['PREWARM_MODE'],
+    profile=app.config['PREWARM_PROFILE'],
+    budget=app.config['PREWARM_BUDGET'],
+    max_load=app.config['PREWARM_MAX_LOAD']
+)
+if prewarmer.top_k > 0:
+    news_cache.on_refresh(prewarmer.on_refresh)
+
+def profile_error(profile):
+    """
+    Error response for an unknown render profile, None when it is valid
+    """
+    if profile is not None and profile not in RENDER_PROFILES:
+        return jsonify({
+            'success': False,
+            'error': f"Unknown profile '{profile}', expected one of {', '.join(PROFILE_ORDER)}"
+        }), 400
+    return None
+
+def promote_payload(source, profile, allow_downgrade):
+    """
+    Payload of a full render from a finished preview's kept inputs
+    """
+    return {
+        'article': source.payload['article'],
+        'promote': source.artifacts,
+        'promoted_from': source.id,
+        'profile': profile,
+        'allow_downgrade': allow_downgrade
+    }
+
+def job_accepted(job, coalesced=False):
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'status_url': f'/api/jobs/{job.id}',
+        'events_url': f'/api/jobs/{job.id}/events',
+        # True when an identical request's job was reused
+        'coalesced': coalesced
+    }), 202
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -26,10 +111,19 @@ def index():
 @app.route('/api/trending-news', methods=['GET'])
 def get_trending_news():
     try:
-        articles = fetch_trending_news(limit=10)
-        return jsonify({'success': True, 'articles': articles})
+        snapshot = news_cache.get()
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
+    
+    response = jsonify({
+        'success': True,
+        'articles': snapshot['articles'],
+        'fetched_at': snapshot['fetched_at']
+    })
+    # Let the browser revalidate with If-None-Match and get a 304 back
+    response.set_etag(snapshot['etag'])
+    response.headers['Cache-Control'] = f"no-cache, stale-while-revalidate={app.config['NEWS_CACHE_TTL']}"
+    return response.make_conditional(request)
 
 @app.route('/api/generate-video', methods=['POST'])
 def generate_video():
@@ -40,37 +134,148 @@ def generate_video():
         if not article:
             return jsonify({'success': False, 'error': 'No article provided'}), 400
         
-        # Step 1: Generate script using GROQ
-        print("Generating script...")
-        script = generate_script(article)
+        profile = data.get('profile')
+        error = profile_error(profile)
+        if error:
+            return error
         
-        # Step 2: Analyze scenes using Gemini
-        print("Analyzing scenes...")
-        scenes = analyze_scenes(script)
+        # Optional cheap preview first: 'video' (low-res proxy) or 'storyboard'
+        preview = data.get('preview')
+        if preview is True:
+            preview = 'video'
+        if preview and preview not in PREVIEW_KINDS:
+            return jsonify({
+                'success': False,
+                'error': f"Unknown preview '{preview}', expected one of {', '.join(PREVIEW_KINDS)}"
+            }), 400
         
-        # Step 3: Fetch media from Pexels
-        print("Fetching media...")
-        media_files = fetch_media(scenes)
+        payload = {
+            'article': article,
+            # Opt-in: reuse memoized LLM responses for the same article
+            'deterministic': data.get('deterministic'),
+            # Render profile (draft, preview, standard, hd); a busy host may downgrade it
+            'profile': profile,
+            'allow_downgrade': data.get('allow_downgrade'),
+            'preview': preview or None
+        }
         
-        # Step 4: Create video
-        print("Creating video...")
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_filename = f'video_{timestamp}.mp4'
-        output_path = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
+        # Identical requests share one job while it runs and for a while after;
+        # 'force' always starts a new one
+        key = None if data.get('force') else job_key(payload)
         
-        create_video(script, scenes, media_files, output_path)
+        # A prewarmed article already has its script, media and voiceover:
+        # render the full video straight from them
+        warm = prewarmer.warmed(article) if key and not preview and not payload['deterministic'] else None
+        if warm:
+            job, coalesced = job_queue.submit_once(promote_payload(warm, profile, payload['allow_downgrade']), key)
+            if not coalesced:
+                PREWARM_JOBS_TOTAL.inc(status='used')
+        else:
+            job, coalesced = job_queue.submit_once(payload, key)
         
-        return jsonify({
-            'success': True,
-            'video_url': f'/outputs/{output_filename}',
-            'script': script,
-            'scenes': scenes
-        })
+        return job_accepted(job, coalesced)
         
+    except QueueFullError as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
     except Exception as e:
         print(f"Error: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/jobs', methods=['GET'])
+def get_queue_stats():
+    return jsonify({
+        'success': True,
+        'queue': job_queue.stats(),
+        'admission': get_admission_controller().stats(),
+        'prewarm': prewarmer.stats() if prewarmer.top_k > 0 else None
+    })
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    job = job_queue.get(job_id)
+    
+    if not job:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    return jsonify({'success': True, 'job': job.to_dict()})
+
+@app.route('/api/jobs/<job_id>/promote', methods=['POST'])
+def promote_job(job_id):
+    """
+    Render the full video for an approved preview from its kept inputs
+    """
+    source = job_queue.get(job_id)
+    
+    if not source:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    if source.status != 'completed' or not source.artifacts:
+        return jsonify({'success': False, 'error': 'Job is not a finished preview'}), 409
+    
+    artifacts = source.artifacts
+    if artifacts['expires_at'] < time.time() or not os.path.isdir(artifacts['workspace']):
+        return jsonify({'success': False, 'error': 'Preview has expired, generate the video again'}), 410
+    
+    data = request.get_json(silent=True) or {}
+    profile = data.get('profile')
+    error = profile_error(profile)
+    if error:
+        return error
+    
+    try:
+        job, coalesced = job_queue.submit_once(promote_payload(source, profile, data.get('allow_downgrade')), request_key(
+            source.payload['article'],
+            promoted_from=source.id,
+            profile=profile or default_profile_name(),
+            allow_downgrade=data.get('allow_downgrade')
+        ))
+    except QueueFullError as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+    
+    return job_accepted(job, coalesced)
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """
+    Server-Sent Events stream of a job's progress, ending when the job does
+    """
+    if not job_queue.get(job_id):
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    def stream():
+        # Tell EventSource how long to wait before reconnecting
+        yield 'retry: 3000\n\n'
+        for event in progress_bus.subscribe(job_id):
+            if event is None:
+                # Comment line keeps proxies from closing an idle connection
+                yield ': keepalive\n\n'
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    
+    response = Response(stream_with_context(stream()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/cache-stats', methods=['GET'])
+def get_cache_stats():
+    media_cache = get_media_cache()
+    scene_cache = get_scene_cache()
+    llm_cache = get_llm_cache()
+    tts_cache = get_tts_cache()
+    return jsonify({
+        'success': True,
+        'media': media_cache.stats() if media_cache else None,
+        'scenes': scene_cache.stats() if scene_cache else None,
+        'llm': llm_cache.stats() if llm_cache else None,
+        'tts': tts_cache.stats() if tts_cache else None
+    })
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    # Prometheus text format: stage, external call and scene render timings
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/outputs/<filename>')
 def serve_video(filename):
     return send_file(os.path.join(app.config['OUTPUT_FOLDER'], filename))
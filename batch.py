@@ -0,0 +1,429 @@
+"""
+Headless batch generation, e.g. for the nightly digest.
+
+Articles go through the pipeline stage by stage as one batch: scripts and
+scene analyses run in concurrent waves, identical Pexels queries and repeated
+narration sentences are fetched once for the whole batch, and renders are
+spread over every core within the admission budget. Progress is written to a
+state file after every stage, so a crashed or interrupted run picks up where
+it stopped.
+
+    python batch.py --trending 10
+    python batch.py --input articles.json --profile draft --llm-concurrency 8
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from dotenv import load_dotenv
+from modules.coalescing import article_identity
+from modules.job_queue import Job
+from modules.media_cache import normalize_query, place_file
+from modules.media_fetcher import MediaFetcher, build_search_query, fallback_media
+from modules.metrics import Trace, bind, tracing
+from modules.news_scraper import fetch_trending_news
+from modules.pipeline import render_inputs
+from modules.render_profiles import PROFILE_ORDER, get_profile
+from modules.scene_analyzer import analyze_scenes
+from modules.script_generator import generate_script
+from modules.tts import audio_duration, split_sentences, synthesize_narration, synthesize_sentence
+from modules.workspace import Workspace
+
+STATE_VERSION = 1
+# Stages in the order a batch runs them; each one is recorded in the state file
+BATCH_STAGES = ['script', 'scenes', 'media', 'voiceover', 'render']
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Generate videos for many articles as one batch')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--input', help="JSON file with a list of articles (or {'articles': [...]}), - for stdin")
+    source.add_argument('--trending', type=int, metavar='N', help='Use the current top N trending articles')
+    parser.add_argument('--profile', default=None, choices=PROFILE_ORDER,
+                        help='Render profile, RENDER_PROFILE by default')
+    parser.add_argument('--no-downgrade', action='store_true',
+                        help='Wait for render capacity instead of rendering a cheaper profile')
+    parser.add_argument('--deterministic', action='store_true', help='Reuse memoized LLM responses')
+    parser.add_argument('--llm-concurrency', type=int, default=4,
+                        help='Articles whose script or scene analysis is generated at once')
+    parser.add_argument('--render-workers', type=int, default=os.cpu_count() or 1,
+                        help='Renders in flight at once; admission control still caps memory and cores')
+    parser.add_argument('--output-folder', default='outputs')
+    parser.add_argument('--work-dir', default=os.path.join('temp', 'batch'),
+                        help='Kept per-article inputs, so a resumed batch does not redo finished stages')
+    parser.add_argument('--state', default=None, help='State file (default <work-dir>/state.json)')
+    parser.add_argument('--report', default=None, help='Report JSON path (default <output-folder>/batch_<timestamp>.json)')
+    parser.add_argument('--fresh', action='store_true', help='Ignore an existing state file and start over')
+    return parser.parse_args(argv)
+
+
+def load_articles(args):
+    if args.trending:
+        return fetch_trending_news(limit=args.trending)
+    if args.input == '-':
+        data = json.load(sys.stdin)
+    else:
+        with open(args.input, encoding='utf-8') as f:
+            data = json.load(f)
+    return data['articles'] if isinstance(data, dict) else data
+
+
+def article_id(article):
+    return hashlib.sha1(article_identity(article).encode('utf-8')).hexdigest()[:12]
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class BatchState:
+    """
+    Per-article progress of a batch, saved to a JSON file after every change
+    """
+
+    def __init__(self, path, fresh=False):
+        self.path = path
+        self.data = {'version': STATE_VERSION, 'articles': OrderedDict()}
+        self._lock = threading.Lock()
+        if not fresh and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f, object_pairs_hook=OrderedDict)
+            if data.get('version') == STATE_VERSION:
+                self.data = data
+                print(f"Resuming batch from {path}")
+
+    def add(self, article):
+        """
+        The state entry of `article`, created when it is new to this batch
+        """
+        with self._lock:
+            entries = self.data['articles']
+            key = article_id(article)
+            if key not in entries:
+                entries[key] = {'id': key, 'article': article, 'done': [], 'timings': {}, 'error': None}
+            return entries[key]
+
+    def entries(self):
+        return list(self.data['articles'].values())
+
+    def complete(self, entry, stage, seconds, **fields):
+        with self._lock:
+            entry.update(fields)
+            if stage not in entry['done']:
+                entry['done'].append(stage)
+            entry['timings'][stage] = round(seconds, 3)
+            entry['error'] = None
+            self._save()
+
+    def fail(self, entry, stage, error):
+        with self._lock:
+            entry['error'] = {'stage': stage, 'message': str(error)}
+            self._save()
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        partial = f'{self.path}.part'
+        with open(partial, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(partial, self.path)
+
+
+class BatchRunner:
+    """
+    Runs every article of a BatchState through the pipeline, one stage at a time
+    """
+
+    def __init__(self, state, args):
+        self.state = state
+        self.args = args
+        self.trace = Trace()
+        self.dedup = {}
+        self.shared = Workspace(args.work_dir, '_shared', retention='always')
+        os.makedirs(self.shared.path, exist_ok=True)
+        os.makedirs(args.output_folder, exist_ok=True)
+
+    def workspace(self, entry):
+        workspace = Workspace(self.args.work_dir, entry['id'], retention='always')
+        os.makedirs(workspace.path, exist_ok=True)
+        return workspace
+
+    def pending(self, stage, *requires):
+        """
+        Entries that still need `stage` and have finished everything it depends on
+        """
+        return [
+            entry for entry in self.state.entries()
+            if stage not in entry['done'] and all(r in entry['done'] for r in requires)
+        ]
+
+    def run(self):
+        self.verify()
+        with tracing(self.trace):
+            self.run_waves('script', self.generate_script)
+            # The voiceover only needs the scripts, so it overlaps with
+            # scene analysis and media fetching
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix='batch-voiceover') as executor:
+                voiceovers = executor.submit(bind(self.synthesize_voiceovers))
+                self.run_waves('scenes', self.analyze_scenes, 'script')
+                self.fetch_media()
+                voiceovers.result()
+            self.render_all()
+
+    def verify(self):
+        # Forget finished stages whose files are gone, so they run again
+        for entry in self.state.entries():
+            if 'media' in entry['done'] and not all(os.path.exists(m['path']) for m in entry.get('media_files', [])):
+                entry['done'].remove('media')
+            if 'voiceover' in entry['done'] and not os.path.exists(entry.get('audio_path', '')):
+                entry['done'].remove('voiceover')
+            if 'render' in entry['done'] and not os.path.exists(entry.get('video_path', '')):
+                entry['done'].remove('render')
+
+    def run_waves(self, stage, work, *requires):
+        """
+        Run an LLM stage for every pending article, `llm_concurrency` at a time
+        """
+        entries = self.pending(stage, *requires)
+        size = max(1, self.args.llm_concurrency)
+        for number, wave in enumerate(chunks(entries, size)):
+            print(f"[{stage}] Wave {number + 1}: {len(wave)} articles")
+            with ThreadPoolExecutor(max_workers=size, thread_name_prefix=f'batch-{stage}') as executor:
+                futures = {executor.submit(bind(self.timed), stage, entry, work): entry for entry in wave}
+                for future in as_completed(futures):
+                    future.result()
+
+    def timed(self, stage, entry, work):
+        started = time.monotonic()
+        try:
+            fields = work(entry)
+        except Exception as e:
+            print(f"[{stage}] {entry['article'].get('title')}: failed: {str(e)}")
+            self.state.fail(entry, stage, e)
+            return
+        self.state.complete(entry, stage, time.monotonic() - started, **fields)
+
+    def generate_script(self, entry):
+        return {'script': generate_script(entry['article'], deterministic=self.args.deterministic or None)}
+
+    def analyze_scenes(self, entry):
+        return {'scenes': analyze_scenes(entry['script'], deterministic=self.args.deterministic or None)}
+
+    def fetch_media(self):
+        """
+        Fetch every distinct Pexels query of the batch once and share the
+        result between the scenes that asked for it
+        """
+        entries = self.pending('media', 'scenes')
+        media_files = {entry['id']: [None] * len(entry['scenes']) for entry in entries}
+        groups = OrderedDict()
+        for entry in entries:
+            for idx, scene in enumerate(entry['scenes']):
+                key = (normalize_query(build_search_query(scene)), scene.get('media_type', 'photo'))
+                groups.setdefault(key, []).append((entry, idx, scene))
+
+        scene_count = sum(len(members) for members in groups.values())
+        self.dedup['media'] = {'scenes': scene_count, 'queries': len(groups)}
+        print(f"[media] {scene_count} scenes, {len(groups)} distinct queries")
+        if not groups:
+            return
+
+        started = time.monotonic()
+        remaining = {entry['id']: len(entry['scenes']) for entry in entries}
+        failed = set()
+        target_size = get_profile(self.args.profile)['size']
+        with MediaFetcher(self.shared, max_workers=len(groups), target_size=target_size) as fetcher:
+            futures = OrderedDict((key, fetcher.submit(n, members[0][2])) for n, (key, members) in enumerate(groups.items()))
+            for key, future in futures.items():
+                try:
+                    media = future.result()
+                except Exception as e:
+                    # Only the articles that share this query fail; the rest keep their media
+                    for entry, idx, scene in groups[key]:
+                        self.fail_media(entry, e, failed)
+                    continue
+                for entry, idx, scene in groups[key]:
+                    if entry['id'] in failed:
+                        continue
+                    try:
+                        media_files[entry['id']][idx] = self.place_media(entry, idx, scene, media)
+                    except Exception as e:
+                        self.fail_media(entry, e, failed)
+                        continue
+                    remaining[entry['id']] -= 1
+                    # Saved as soon as an article has all its scenes, so a resume does not refetch them
+                    if not remaining[entry['id']]:
+                        self.state.complete(
+                            entry, 'media', time.monotonic() - started, media_files=media_files[entry['id']]
+                        )
+
+    def place_media(self, entry, idx, scene, media):
+        workspace = self.workspace(entry)
+        # Fallback images show each scene's own description, so they are not shared
+        if os.path.basename(media['path']).startswith('fallback_scene'):
+            return fallback_media(idx, scene, workspace.path)
+        extension = os.path.splitext(media['path'])[1]
+        filename = workspace.file(f"scene_{idx}_{media['type']}{extension}")
+        place_file(media['path'], filename)
+        return dict(media, scene_number=scene.get('scene_number'), path=filename)
+
+    def fail_media(self, entry, error, failed):
+        if entry['id'] not in failed:
+            print(f"[media] {entry['article'].get('title')}: failed: {str(error)}")
+            failed.add(entry['id'])
+            self.state.fail(entry, 'media', error)
+
+    def synthesize_voiceovers(self):
+        """
+        Speak every distinct sentence of the batch once, then stitch each
+        article's voiceover from them
+        """
+        entries = self.pending('voiceover', 'script')
+        sentences = [
+            sentence
+            for entry in entries
+            for scene in entry['script'].get('scenes', [])
+            for sentence in split_sentences(scene.get('narration', ''))
+        ]
+        unique = list(dict.fromkeys(sentences))
+        self.dedup['voiceover'] = {'sentences': len(sentences), 'distinct': len(unique)}
+        print(f"[voiceover] {len(sentences)} sentences, {len(unique)} distinct")
+
+        spoken = {}
+        max_workers = max(1, min(int(os.getenv('TTS_CONCURRENCY', 4)), len(unique) or 1))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='batch-tts') as executor:
+            futures = {
+                executor.submit(bind(synthesize_sentence), sentence, self.shared.path): sentence
+                for sentence in unique
+            }
+            for future in as_completed(futures):
+                try:
+                    spoken[futures[future]] = future.result()
+                except Exception as e:
+                    # The article's own voiceover retries the sentence and fails alone
+                    print(f"[voiceover] Sentence failed: {str(e)}")
+
+        for entry in entries:
+            self.timed('voiceover', entry, lambda entry: self.stitch_voiceover(entry, spoken))
+
+    def stitch_voiceover(self, entry, spoken):
+        workspace = self.workspace(entry)
+        audio_path = workspace.file('voiceover.mp3')
+        script = entry['script']
+        durations = synthesize_narration(script, script.get('scenes', []), audio_path, workspace.path, spoken=spoken)
+        return {'audio_path': audio_path, 'scene_durations': durations}
+
+    def render_all(self):
+        entries = self.pending('render', 'media', 'voiceover')
+        print(f"[render] {len(entries)} videos, {self.args.render_workers} at a time")
+        with ThreadPoolExecutor(max_workers=max(1, self.args.render_workers), thread_name_prefix='batch-render') as executor:
+            futures = [executor.submit(self.timed, 'render', entry, self.render) for entry in entries]
+            for future in futures:
+                future.result()
+
+    def render(self, entry):
+        job = Job({
+            'article': entry['article'],
+            'profile': self.args.profile,
+            'allow_downgrade': False if self.args.no_downgrade else None
+        })
+        try:
+            with tracing(job.trace):
+                result = render_inputs(job, self.args.output_folder, self.workspace(entry), entry)
+        finally:
+            # A failed render never finishes its stage, so its memory sampler is stopped here
+            job.stop_sampling()
+        duration = sum(entry['scene_durations']) if entry['scene_durations'] else audio_duration(entry['audio_path'])
+        return {
+            'video_path': os.path.join(self.args.output_folder, os.path.basename(result['video_url'])),
+            'profile': result['profile'],
+            'video_seconds': round(duration, 2)
+        }
+
+
+def build_report(state, runner, wall_seconds):
+    """
+    Per-article results plus aggregate throughput of this run
+    """
+    articles = []
+    stage_totals = {}
+    for entry in state.entries():
+        finished = 'render' in entry['done']
+        for stage, seconds in entry['timings'].items():
+            stage_totals[stage] = stage_totals.get(stage, 0) + seconds
+        articles.append({
+            'id': entry['id'],
+            'title': entry['article'].get('title'),
+            'status': 'completed' if finished else 'failed' if entry['error'] else 'pending',
+            'error': entry['error'],
+            'timings': entry['timings'],
+            'profile': entry.get('profile'),
+            'video_seconds': entry.get('video_seconds'),
+            'video_path': entry.get('video_path'),
+        })
+
+    completed = [a for a in articles if a['status'] == 'completed']
+    video_seconds = sum(a['video_seconds'] or 0 for a in completed)
+    return {
+        'finished_at': datetime.now().isoformat(),
+        'wall_seconds': round(wall_seconds, 2),
+        'completed': len(completed),
+        'failed': sum(1 for a in articles if a['status'] == 'failed'),
+        'pending': sum(1 for a in articles if a['status'] == 'pending'),
+        'videos_per_hour': round(len(completed) * 3600 / wall_seconds, 2) if wall_seconds else None,
+        # Seconds of video produced per second of wall time
+        'realtime_factor': round(video_seconds / wall_seconds, 3) if wall_seconds else None,
+        'stage_seconds': {stage: round(seconds, 2) for stage, seconds in stage_totals.items()},
+        'deduplication': runner.dedup,
+        'external_calls': runner.trace.to_dict()['external_calls'],
+        'articles': articles,
+    }
+
+
+def print_report(report):
+    print()
+    print(f"{'status':<10} {'script':>7} {'scenes':>7} {'media':>7} {'voice':>7} {'render':>7}  title")
+    for article in report['articles']:
+        timings = [article['timings'].get(stage) for stage in BATCH_STAGES]
+        cells = ' '.join(f"{t:7.1f}" if t is not None else f"{'-':>7}" for t in timings)
+        print(f"{article['status']:<10} {cells}  {(article['title'] or '')[:60]}")
+    print()
+    print(f"{report['completed']} completed, {report['failed']} failed, {report['pending']} pending "
+          f"in {report['wall_seconds']}s ({report['videos_per_hour']} videos/hour, "
+          f"{report['realtime_factor']}x realtime)")
+    for stage, counts in report['deduplication'].items():
+        print(f"  {stage}: {counts}")
+
+
+def main(argv=None):
+    load_dotenv()
+    args = parse_args(argv)
+    state = BatchState(args.state or os.path.join(args.work_dir, 'state.json'), fresh=args.fresh)
+    for article in load_articles(args):
+        state.add(article)
+
+    runner = BatchRunner(state, args)
+    started = time.monotonic()
+    runner.run()
+    report = build_report(state, runner, time.monotonic() - started)
+
+    report_path = args.report or os.path.join(
+        args.output_folder, f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print_report(report)
+    print(f"Report written to {report_path}")
+    return 0 if report['failed'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
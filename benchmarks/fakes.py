@@ -0,0 +1,275 @@
+import json
+import os
+import random
+import re
+import shutil
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+from benchmarks.fixtures import build_script
+from modules.tts import make_silence
+
+# Speaking rate of the fake voice, close to gTTS's
+WORDS_PER_SECOND = 2.6
+
+
+class ServiceProfile:
+    """
+    How a stand-in service behaves: added latency, random failures and a request quota
+
+    quota: requests allowed per `window` seconds, None for no limit
+    """
+
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, quota=None, window=60, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.quota = quota
+        self.window = window
+        self._random = random.Random(seed)
+        self._window_start = time.time()
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def delay(self):
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        time.sleep(max(0, self.latency_ms + jitter) / 1000)
+
+    def should_fail(self):
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def take(self):
+        """
+        Count one request against the quota
+        Returns (allowed, remaining, reset) with reset as a Unix timestamp
+        """
+        with self._lock:
+            now = time.time()
+            if now - self._window_start >= self.window:
+                self._window_start = now
+                self._used = 0
+            reset = int(self._window_start + self.window)
+            if self.quota is None:
+                return True, None, reset
+            if self._used >= self.quota:
+                return False, 0, reset
+            self._used += 1
+            return True, self.quota - self._used, reset
+
+    def to_dict(self):
+        return {
+            'latency_ms': self.latency_ms,
+            'jitter_ms': self.jitter_ms,
+            'error_rate': self.error_rate,
+            'quota': self.quota,
+            'window': self.window,
+        }
+
+
+class FakeServer:
+    """
+    Local HTTP stand-in for the Pexels API, the Pexels image CDN and NewsAPI
+    """
+
+    def __init__(self, corpus, image_paths, profiles):
+        self.corpus = corpus
+        self.image_paths = image_paths
+        self.profiles = profiles
+        self.requests = {}
+        self._lock = threading.Lock()
+        self._images = {}
+        for path in image_paths:
+            with open(path, 'rb') as f:
+                self._images[os.path.basename(path)] = f.read()
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='fake-services', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.stop()
+        return False
+
+    def _count(self, route, outcome):
+        with self._lock:
+            counts = self.requests.setdefault(route, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                if url.path == '/v1/search':
+                    self._serve('pexels', lambda: self._search(query), rate_limited=True)
+                elif url.path.startswith('/photos/'):
+                    self._serve('pexels_cdn', lambda: self._photo(os.path.basename(url.path)))
+                elif url.path == '/v2/top-headlines':
+                    self._serve('newsapi', lambda: self._headlines(query))
+                else:
+                    self._send(404, b'{"error": "not found"}')
+
+            def _serve(self, service, respond, rate_limited=False):
+                profile = server.profiles[service]
+                headers = {}
+                if rate_limited:
+                    allowed, remaining, reset = profile.take()
+                    if remaining is not None:
+                        headers['X-Ratelimit-Limit'] = str(profile.quota)
+                        headers['X-Ratelimit-Remaining'] = str(remaining)
+                        headers['X-Ratelimit-Reset'] = str(reset)
+                    if not allowed:
+                        server._count(service, 'rate_limited')
+                        self._send(429, b'{"error": "rate limit exceeded"}', headers)
+                        return
+
+                profile.delay()
+                if profile.should_fail():
+                    server._count(service, 'error')
+                    self._send(500, b'{"error": "injected failure"}', headers)
+                    return
+
+                status, body, content_type = respond()
+                server._count(service, 'ok' if status == 200 else str(status))
+                self._send(status, body, headers, content_type)
+
+            def _search(self, query):
+                if not self.headers.get('Authorization'):
+                    return 403, b'{"error": "missing api key"}', 'application/json'
+                # The same query always returns the same photos, like a real index
+                names = sorted(server._images)
+                start = sum(map(ord, query.get('query', ''))) % len(names)
+                per_page = int(query.get('per_page', 3))
+                photos = []
+                for n in range(per_page):
+                    name = names[(start + n) % len(names)]
+                    src = f'{server.url}/photos/{name}'
+                    photos.append({'id': start + n, 'src': {'large': src, 'medium': src}})
+                return 200, json.dumps({'photos': photos}).encode('utf-8'), 'application/json'
+
+            def _photo(self, name):
+                data = server._images.get(name)
+                if data is None:
+                    return 404, b'', 'application/octet-stream'
+                return 200, data, 'image/jpeg'
+
+            def _headlines(self, query):
+                articles = server.corpus['articles'][:int(query.get('pageSize', 10))]
+                return 200, json.dumps({'status': 'ok', 'articles': articles}).encode('utf-8'), 'application/json'
+
+            def _send(self, status, body, headers=None, content_type='application/json'):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+class FakeGroq:
+    """
+    Stand-in for the Groq client: returns a fixture script with `scene_count` scenes
+    """
+
+    def __init__(self, profile, corpus, scene_count=4):
+        self.profile = profile
+        self.corpus = corpus
+        self.scene_count = scene_count
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, **params):
+        self.profile.delay()
+        if self.profile.should_fail():
+            raise Exception("Injected Groq failure")
+        content = json.dumps(build_script(self.scene_count, self.corpus))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class FakeGemini:
+    """
+    Stand-in for the Gemini model factory; keywords come from the scene descriptions
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+
+    def __call__(self, model_name, generation_config=None):
+        return SimpleNamespace(generate_content=self._generate_content)
+
+    def _generate_content(self, prompt):
+        self.profile.delay()
+        if self.profile.should_fail():
+            raise Exception("Injected Gemini failure")
+
+        visuals = re.findall(r'^(?:Scene|Visual): (.*)$', prompt, re.MULTILINE)
+        analyses = [
+            {
+                'keywords': [word.lower() for word in visual.split() if len(word) > 3][:4] or ['news'],
+                'media_type': 'photo',
+                'mood': 'informative'
+            }
+            for visual in visuals
+        ]
+        if 'JSON array' in prompt:
+            return SimpleNamespace(text=json.dumps(analyses))
+        return SimpleNamespace(text=json.dumps(analyses[0] if analyses else {}))
+
+
+class FakeSpeech:
+    """
+    Stand-in for gTTS: writes silence as long as the text would take to speak
+
+    Silent clips are encoded once per length and copied afterwards, so the
+    stand-in itself does not dominate the voiceover timings.
+    """
+
+    def __init__(self, profile, directory):
+        self.profile = profile
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, text, lang='en', slow=False):
+        return SimpleNamespace(save=lambda path: self._save(text, path))
+
+    def _save(self, text, path):
+        self.profile.delay()
+        if self.profile.should_fail():
+            raise Exception("Injected gTTS failure")
+
+        duration = max(0.5, round(len(text.split()) / WORDS_PER_SECOND, 1))
+        clip = os.path.join(self.directory, f'silence_{duration:.1f}.mp3')
+        with self._lock:
+            if not os.path.exists(clip):
+                make_silence(clip, duration)
+        shutil.copyfile(clip, path)
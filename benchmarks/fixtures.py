@@ -0,0 +1,70 @@
+import json
+import os
+import random
+from PIL import Image, ImageDraw, ImageFilter
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+# Stock photos are landscape and larger than 1080p, like Pexels' "large" size
+IMAGE_SIZE = (1880, 1253)
+IMAGE_COUNT = 12
+
+
+def load_corpus():
+    with open(os.path.join(FIXTURE_DIR, 'scripts.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def build_script(scene_count, corpus=None):
+    """
+    A script in the shape generate_script returns, with `scene_count` scenes
+    taken from the fixture corpus (cycled when more are asked for)
+    """
+    corpus = corpus or load_corpus()
+    scenes = []
+    for n in range(scene_count):
+        fixture = corpus['scenes'][n % len(corpus['scenes'])]
+        scenes.append({
+            'scene_number': n + 1,
+            'duration': 5,
+            'narration': fixture['narration'],
+            'visual_description': fixture['visual_description']
+        })
+    return {
+        'script_text': ' '.join(scene['narration'] for scene in scenes),
+        'scenes': scenes,
+        'total_duration': 5 * scene_count
+    }
+
+
+def fixture_images(directory, count=IMAGE_COUNT, size=IMAGE_SIZE):
+    """
+    Deterministic photo-like JPEGs, generated once into `directory`
+    Returns their paths; binary fixtures are not kept in the repository
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for n in range(count):
+        path = os.path.join(directory, f'photo_{n:02d}.jpg')
+        paths.append(path)
+        if os.path.exists(path):
+            continue
+
+        rng = random.Random(n)
+        width, height = size
+        # Vertical gradient with random shapes, blurred so it compresses like a photo
+        top = tuple(rng.randrange(256) for _ in range(3))
+        bottom = tuple(rng.randrange(256) for _ in range(3))
+        image = Image.linear_gradient('L').resize(size)
+        image = Image.composite(Image.new('RGB', size, bottom), Image.new('RGB', size, top), image)
+        draw = ImageDraw.Draw(image)
+        for _ in range(40):
+            x, y = rng.randrange(width), rng.randrange(height)
+            radius = rng.randrange(20, 300)
+            color = tuple(rng.randrange(256) for _ in range(3))
+            draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=color)
+        image = image.filter(ImageFilter.GaussianBlur(6))
+
+        partial = f'{path}.part'
+        image.save(partial, format='JPEG', quality=85)
+        os.replace(partial, path)
+    return paths
@@ -0,0 +1,363 @@
+"""
+Offline benchmark of the whole generation pipeline.
+
+NewsAPI, Pexels and its image CDN are served by a local fake HTTP server;
+Groq, Gemini and gTTS are replaced by in-process stand-ins. Each service can
+be given latency, random failures and (for Pexels) a request quota, so runs
+are repeatable and measure only this code.
+
+    python -m benchmarks.run --sizes 720p,1080p --scenes 3,6 --repeat 3
+    python -m benchmarks.run --baseline benchmarks/baselines/main.json --fail-on-regression
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from modules.job_queue import Job
+from modules.metrics import MemorySampler, Trace, tracing
+from modules.progress import ProgressBus
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PRESET_SIZES = {'360p': '640x360', '720p': '1280x720', '1080p': '1920x1080'}
+SERVICES = ['newsapi', 'groq', 'gemini', 'pexels', 'pexels_cdn', 'gtts']
+SAMPLE_INTERVAL = 0.05
+BENCHMARK_PROFILE = 'standard'
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the video pipeline against local stand-ins')
+    parser.add_argument('--sizes', default='720p,1080p',
+                        help='Comma separated output sizes, WIDTHxHEIGHT or 360p/720p/1080p')
+    parser.add_argument('--scenes', default='3,6', help='Comma separated scene counts')
+    parser.add_argument('--repeat', type=int, default=3, help='Pipeline runs per size and scene count')
+    parser.add_argument('--concurrency', type=int, default=1, help='Pipeline runs in flight at once')
+    parser.add_argument('--latency-ms', type=float, default=50, help='Added latency of every service')
+    parser.add_argument('--jitter-ms', type=float, default=10, help='Random +/- latency of every service')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of calls that fail')
+    parser.add_argument('--pexels-quota', type=int, default=None,
+                        help='Pexels searches allowed per --pexels-window seconds')
+    parser.add_argument('--pexels-window', type=float, default=60)
+    parser.add_argument('--warm', action='store_true',
+                        help='Keep the media, scene, LLM and TTS caches enabled between runs')
+    parser.add_argument('--work-dir', default=None, help='Scratch folder (a temporary one by default)')
+    parser.add_argument('--output', default=None,
+                        help='Result JSON path (default benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--baseline', default=None, help='Earlier result JSON to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.10,
+                        help='Allowed slowdown against the baseline before it counts as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit with status 1 on a regression')
+    return parser.parse_args(argv)
+
+
+def parse_sizes(value):
+    sizes = []
+    for item in value.split(','):
+        item = PRESET_SIZES.get(item.strip(), item.strip())
+        width, height = item.lower().split('x')
+        sizes.append((int(width), int(height)))
+    return sizes
+
+
+def percentiles(values):
+    """
+    Nearest-rank percentiles of a list of numbers
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def rank(p):
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    return {
+        'p50': round(rank(50), 4),
+        'p90': round(rank(90), 4),
+        'p99': round(rank(99), 4),
+        'mean': round(sum(ordered) / len(ordered), 4),
+        'min': round(ordered[0], 4),
+        'max': round(ordered[-1], 4),
+    }
+
+
+class SampleTrace(Trace):
+    """
+    Job trace that also keeps every external call latency, for percentiles
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._samples = {}
+
+    def record_call(self, service, seconds):
+        super().record_call(service, seconds)
+        with self._lock:
+            self._samples.setdefault(service, []).append(seconds)
+
+    def samples(self):
+        with self._lock:
+            return {service: list(samples) for service, samples in self._samples.items()}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=BENCHMARK_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def configure_environment(args, work_dir, server_url):
+    """
+    Point the pipeline at the fake server and keep its caches inside the work folder
+    Must run before the pipeline modules are imported
+    """
+    os.environ.update({
+        'PEXELS_API_BASE': server_url,
+        'PEXELS_API_KEY': 'benchmark',
+        'NEWSAPI_BASE_URL': server_url,
+        'NEWS_API_KEY': 'benchmark',
+        'GROQ_API_KEY': 'benchmark',
+        'GEMINI_API_KEY': 'benchmark',
+        'KEEP_WORKSPACES': 'never',
+    })
+    for cache in ('MEDIA', 'SCENE', 'LLM', 'TTS', 'VIDEO_PROXY'):
+        os.environ[f'{cache}_CACHE_ENABLED'] = '1' if args.warm else '0'
+        os.environ[f'{cache}_CACHE_DIR'] = os.path.join(work_dir, 'cache', cache.lower())
+
+
+def run_once(article, output_folder, temp_folder):
+    """
+    One full pipeline run, as the job queue would execute it
+    """
+    # Imported late: these modules read their endpoints from the environment
+    from modules.news_scraper import fetch_trending_news
+    from modules.pipeline import run_pipeline
+
+    bus = ProgressBus()
+    # Pinned so the admission controller cannot downgrade a busy run and
+    # skew its timings; 'standard' follows the VIDEO_SIZE being measured
+    job = Job({
+        'article': article,
+        'deterministic': False,
+        'profile': BENCHMARK_PROFILE,
+        'allow_downgrade': False
+    }, bus=bus)
+    job.trace = SampleTrace()
+    error = None
+    output_bytes = 0
+    profile = None
+
+    started = time.perf_counter()
+    try:
+        with tracing(job.trace):
+            # The trending feed is fetched too, as the page does before every job
+            fetch_trending_news(limit=10)
+            result = run_pipeline(job, output_folder, temp_folder)
+        profile = result.get('profile')
+        output_path = os.path.join(output_folder, os.path.basename(result['video_url']))
+        output_bytes = os.path.getsize(output_path)
+        os.remove(output_path)
+    except Exception as e:
+        error = str(e)
+    finally:
+        job.stop_sampling()
+    elapsed = time.perf_counter() - started
+
+    frames = [event['total_frames'] for event in bus.events(job.id) if event['type'] == 'render_progress']
+    return {
+        'seconds': elapsed,
+        'stages': dict(job.stage_times),
+        'frames': max(frames) if frames else 0,
+        'calls': job.trace.samples(),
+        'output_bytes': output_bytes,
+        'profile': profile,
+        'error': error,
+    }
+
+
+def run_config(args, size, scene_count, groq, corpus, work_dir):
+    width, height = size
+    os.environ['VIDEO_SIZE'] = f'{width}x{height}'
+    groq.scene_count = scene_count
+    output_folder = os.path.join(work_dir, 'outputs')
+    temp_folder = os.path.join(work_dir, 'temp')
+    os.makedirs(output_folder, exist_ok=True)
+    articles = corpus['articles']
+
+    print(f"Benchmarking {width}x{height} with {scene_count} scenes ({args.repeat} runs)...")
+    with MemorySampler(SAMPLE_INTERVAL) as memory:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+            runs = list(executor.map(
+                lambda n: run_once(articles[n % len(articles)], output_folder, temp_folder),
+                range(args.repeat)
+            ))
+        wall = time.perf_counter() - started
+
+    completed = [run for run in runs if run['error'] is None]
+    for run in runs:
+        if run['error']:
+            print(f"  Run failed: {run['error']}")
+
+    stages = {}
+    for run in completed:
+        for stage, seconds in run['stages'].items():
+            stages.setdefault(stage, []).append(seconds)
+    calls = {}
+    for run in runs:
+        for service, samples in run['calls'].items():
+            calls.setdefault(service, []).extend(samples)
+    render_seconds = sum(run['stages'].get('render', 0) for run in completed)
+    profiles = {}
+    for run in completed:
+        profiles[run['profile']] = profiles.get(run['profile'], 0) + 1
+
+    return {
+        'key': f'{width}x{height}/{scene_count}',
+        'size': f'{width}x{height}',
+        'scenes': scene_count,
+        'runs': len(runs),
+        # Granted render profile -> completed runs, so a downgraded run is never mistaken for a speedup
+        'profiles': profiles,
+        'failed': len(runs) - len(completed),
+        'wall_seconds': round(wall, 3),
+        'throughput_videos_per_min': round(60 * len(completed) / wall, 3) if wall else None,
+        'render_fps': round(sum(run['frames'] for run in completed) / render_seconds, 2) if render_seconds else None,
+        'latency': percentiles([run['seconds'] for run in completed]),
+        'stages': {stage: percentiles(values) for stage, values in stages.items()},
+        'external_calls': {
+            service: dict(percentiles(samples), calls=len(samples)) for service, samples in calls.items()
+        },
+        'peak_rss_mb': round(memory.peak / (1024 * 1024), 1),
+        'output_mb': round(sum(run['output_bytes'] for run in completed) / max(1, len(completed)) / (1024 * 1024), 2),
+    }
+
+
+def compare(results, baseline, max_regression):
+    """
+    Compare median latency and throughput with a baseline
+    Returns (report lines, whether anything regressed)
+    """
+    previous = {entry['key']: entry for entry in baseline.get('results', [])}
+    lines = [f"{'config':<16}{'p50 s':>10}{'base':>10}{'change':>9}{'videos/min':>12}{'base':>10}{'change':>9}"]
+    regressed = False
+
+    for entry in results:
+        old = previous.get(entry['key'])
+        if not old or not entry['latency'] or not old.get('latency'):
+            lines.append(f"{entry['key']:<16}  (no baseline)")
+            continue
+        latency, old_latency = entry['latency']['p50'], old['latency']['p50']
+        throughput, old_throughput = entry['throughput_videos_per_min'], old['throughput_videos_per_min']
+        latency_change = (latency - old_latency) / old_latency if old_latency else 0
+        throughput_change = (throughput - old_throughput) / old_throughput if old_throughput else 0
+        flag = ''
+        if latency_change > max_regression or throughput_change < -max_regression:
+            regressed = True
+            flag = '  REGRESSION'
+        lines.append(
+            f"{entry['key']:<16}{latency:>10.2f}{old_latency:>10.2f}{latency_change:>+9.1%}"
+            f"{throughput:>12.2f}{old_throughput:>10.2f}{throughput_change:>+9.1%}{flag}"
+        )
+    return lines, regressed
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = parse_sizes(args.sizes)
+    scene_counts = [int(n) for n in args.scenes.split(',')]
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='videogen-bench-')
+    os.makedirs(work_dir, exist_ok=True)
+
+    from benchmarks.fixtures import fixture_images, load_corpus
+    from benchmarks.fakes import FakeGemini, FakeGroq, FakeServer, FakeSpeech, ServiceProfile
+
+    corpus = load_corpus()
+    images = fixture_images(os.path.join(BENCHMARK_DIR, '.fixtures'))
+    profiles = {
+        service: ServiceProfile(args.latency_ms, args.jitter_ms, args.error_rate, seed=n)
+        for n, service in enumerate(SERVICES)
+    }
+    profiles['pexels'].quota = args.pexels_quota
+    profiles['pexels'].window = args.pexels_window
+
+    try:
+        with FakeServer(corpus, images, profiles) as server:
+            configure_environment(args, work_dir, server.url)
+
+            from modules.clients import override_client
+            groq = FakeGroq(profiles['groq'], corpus)
+            override_client('groq', groq)
+            override_client('gemini', FakeGemini(profiles['gemini']))
+            override_client('gtts', FakeSpeech(profiles['gtts'], os.path.join(work_dir, 'speech')))
+
+            results = [
+                run_config(args, size, scene_count, groq, corpus, work_dir)
+                for size in sizes
+                for scene_count in scene_counts
+            ]
+            requests = server.requests
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'settings': {
+                key: os.getenv(key) for key in (
+                    'RENDER_MODE', 'RENDER_PROCESSES', 'VIDEO_PRESET', 'VIDEO_CRF', 'VIDEO_THREADS',
+                    'SCENE_ANALYSIS_MODE', 'MEDIA_FETCH_CONCURRENCY', 'TTS_CONCURRENCY',
+                    'PEXELS_RATE_PER_SEC', 'PEXELS_RATE_BURST'
+                )
+            },
+            'args': vars(args),
+            'services': {service: profile.to_dict() for service, profile in profiles.items()},
+            'fake_server_requests': requests,
+        },
+        'results': results,
+    }
+
+    output = args.output or os.path.join(
+        BENCHMARK_DIR, 'results', f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    for entry in results:
+        latency = entry['latency'] or {}
+        print(
+            f"{entry['key']:<16} p50 {latency.get('p50', 0):.2f}s  p90 {latency.get('p90', 0):.2f}s  "
+            f"{entry['throughput_videos_per_min']} videos/min  {entry['render_fps']} render fps  "
+            f"peak {entry['peak_rss_mb']} MB  failed {entry['failed']}/{entry['runs']}"
+        )
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        lines, regressed = compare(results, baseline, args.max_regression)
+        print('\n'.join(lines))
+        if regressed and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,182 @@
+import os
+import threading
+from contextlib import contextmanager
+from modules.render_profiles import get_profile, lower_profiles
+from modules.segment_renderer import render_processes, uses_segments
+
+MB = 1024 * 1024
+# Python, downloaded media and audio held by a job while it renders
+JOB_BASE_MB = 150
+# ffmpeg process, decoders and x264's own tables
+ENCODER_BASE_MB = 40
+# Frames x264 keeps in flight per preset (lookahead plus reference frames)
+ENCODER_FRAMES = {
+    'ultrafast': 6, 'superfast': 8, 'veryfast': 18, 'faster': 28, 'fast': 38,
+    'medium': 48, 'slow': 68, 'slower': 68, 'veryslow': 68,
+}
+# Rough x264 cost in core-seconds per megapixel frame; rendering adds RENDER_CPU_PER_MP
+ENCODER_CPU_PER_MP = {
+    'ultrafast': 0.004, 'superfast': 0.006, 'veryfast': 0.01, 'faster': 0.016, 'fast': 0.022,
+    'medium': 0.03, 'slow': 0.05, 'slower': 0.08, 'veryslow': 0.15,
+}
+RENDER_CPU_PER_MP = 0.01
+# Presets that encode faster than one core can draw frames
+FAST_PRESETS = ('ultrafast', 'superfast', 'veryfast')
+
+
+def total_memory_mb():
+    try:
+        return os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / MB
+    except (AttributeError, ValueError, OSError):
+        return 4096
+
+
+class AdmissionController:
+    """
+    Reserves memory and cores for each render so concurrent jobs stay
+    within the host's budget.
+
+    A render that does not fit either waits for running renders to release
+    their share or, when downgrades are allowed, takes the best cheaper
+    profile that fits right away. Renders are admitted in arrival order.
+    """
+
+    def __init__(self, memory_budget_mb, cpu_budget, allow_downgrade=True):
+        self.memory_budget_mb = memory_budget_mb
+        self.cpu_budget = max(1, cpu_budget)
+        self.allow_downgrade = allow_downgrade
+        self.memory_reserved_mb = 0
+        self.cores_reserved = 0
+        self.running = 0
+        self.downgrades = 0
+        self._waiting = []
+        self._condition = threading.Condition()
+
+    def estimate(self, profile, scene_count, duration):
+        """
+        Memory (MB), cores and CPU time a render with `profile` needs
+        """
+        width, height = profile['size']
+        pixels = width * height
+        frame_mb = pixels * 3 / MB
+
+        # Scaled source image (up to 16:9 at the zoomed height), the output
+        # frame, its resample and caption blend, plus x264's YUV frames
+        renderer_mb = frame_mb * 1.1 + frame_mb * 4
+        encoder_mb = ENCODER_BASE_MB + ENCODER_FRAMES.get(profile['preset'], 48) * pixels * 1.5 / MB
+        parallel = min(max(1, scene_count), render_processes()) if uses_segments() else 1
+
+        frames = duration * profile['fps']
+        cpu_per_frame = (ENCODER_CPU_PER_MP.get(profile['preset'], 0.03) + RENDER_CPU_PER_MP) * pixels / 1e6
+        return {
+            'memory_mb': round(JOB_BASE_MB + parallel * (renderer_mb + encoder_mb)),
+            'cores': min(self.cpu_budget, parallel if uses_segments() else self._stream_cores(profile)),
+            'cpu_seconds': round(frames * cpu_per_frame, 1),
+        }
+
+    def _stream_cores(self, profile):
+        # A streamed render keeps one core drawing frames; slower presets
+        # keep at least one more busy encoding them
+        return 1 if profile['preset'] in FAST_PRESETS else 2
+
+    @contextmanager
+    def reserve(self, profile_name, scene_count, duration, allow_downgrade=None, on_wait=None):
+        """
+        Block until a render fits and hold its reservation for the block
+        Yields the granted profile; it carries 'requested' and 'estimate'
+        on_wait: optional callback(estimate) called once if the render has to wait
+        """
+        requested = get_profile(profile_name)
+        allow_downgrade = self.allow_downgrade if allow_downgrade is None else allow_downgrade
+        ticket = object()
+        waited = False
+
+        with self._condition:
+            self._waiting.append(ticket)
+            try:
+                while True:
+                    granted = self._select(requested, scene_count, duration, ticket, allow_downgrade)
+                    if granted:
+                        break
+                    if not waited and on_wait:
+                        on_wait(self.estimate(requested, scene_count, duration))
+                    waited = True
+                    self._condition.wait(timeout=5)
+            finally:
+                self._waiting.remove(ticket)
+                self._condition.notify_all()
+
+            profile, estimate = granted
+            self.memory_reserved_mb += estimate['memory_mb']
+            self.cores_reserved += estimate['cores']
+            self.running += 1
+            if profile['name'] != requested['name']:
+                self.downgrades += 1
+
+        profile['requested'] = requested['name']
+        profile['estimate'] = estimate
+        try:
+            yield profile
+        finally:
+            with self._condition:
+                self.memory_reserved_mb -= estimate['memory_mb']
+                self.cores_reserved -= estimate['cores']
+                self.running -= 1
+                self._condition.notify_all()
+
+    def _select(self, requested, scene_count, duration, ticket, allow_downgrade):
+        # Returns (profile, estimate) when this render may start now
+        if self._waiting[0] is not ticket:
+            return None
+
+        candidates = [requested]
+        if allow_downgrade:
+            candidates += [get_profile(name) for name in lower_profiles(requested['name'])]
+        for profile in candidates:
+            estimate = self.estimate(profile, scene_count, duration)
+            if self._fits(estimate):
+                return profile, estimate
+
+        if self.running == 0:
+            # Nothing else is running, so waiting cannot help: take the cheapest allowed
+            profile = candidates[-1]
+            return profile, self.estimate(profile, scene_count, duration)
+        return None
+
+    def _fits(self, estimate):
+        return (
+            self.memory_reserved_mb + estimate['memory_mb'] <= self.memory_budget_mb
+            and self.cores_reserved + estimate['cores'] <= self.cpu_budget
+        )
+
+    def stats(self):
+        with self._condition:
+            return {
+                'memory_budget_mb': round(self.memory_budget_mb),
+                'memory_reserved_mb': round(self.memory_reserved_mb),
+                'cpu_budget': self.cpu_budget,
+                'cores_reserved': self.cores_reserved,
+                'running': self.running,
+                'waiting': len(self._waiting),
+                'downgrades': self.downgrades,
+            }
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller():
+    """
+    Process-wide admission controller; budgets come from ADMISSION_MEMORY_MB
+    (default 70% of physical memory) and ADMISSION_CPUS (default all cores)
+    """
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController(
+                memory_budget_mb=float(os.getenv('ADMISSION_MEMORY_MB', 0)) or total_memory_mb() * 0.7,
+                cpu_budget=int(os.getenv('ADMISSION_CPUS', 0)) or os.cpu_count() or 1,
+                allow_downgrade=os.getenv('ADMISSION_DOWNGRADE', '1').lower() not in ('0', 'false', 'no')
+            )
+        return _controller
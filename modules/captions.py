@@ -0,0 +1,76 @@
+from functools import lru_cache
+import numpy as np
+from PIL import Image, ImageDraw
+from modules.fonts import font_lock, font_path, get_font, text_width, wrap_text
+
+# Caption style at 720p; scaled with the output height
+CAPTION_FONT_SIZE = 40
+CAPTION_WIDTH = 1100
+STROKE_WIDTH = 2
+LINE_SPACING = 1.2
+MAX_CAPTION_CHARS = 100
+
+
+@lru_cache(maxsize=128)
+def rasterize_caption(text, font_size, max_width, stroke_width, font):
+    """
+    Draw white, black-stroked, centered and wrapped caption text once
+    Returns read-only (rgb, alpha) arrays; `font` is part of the cache key
+    """
+    lines = wrap_text(text, font_size, max_width - 2 * stroke_width) or ['']
+    pil_font = get_font(font_size)
+    if font is None:
+        # Pillow's bitmap fallback font cannot be stroked
+        stroke_width = 0
+    line_height = int(round(font_size * LINE_SPACING))
+    height = line_height * len(lines) + 2 * stroke_width
+
+    canvas = Image.new('RGBA', (max_width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(canvas)
+    with font_lock:
+        y = stroke_width
+        for line in lines:
+            x = int((max_width - text_width(line, font_size)) // 2)
+            draw.text(
+                (x, y),
+                line,
+                font=pil_font,
+                fill=(255, 255, 255, 255),
+                stroke_width=stroke_width,
+                stroke_fill=(0, 0, 0, 255)
+            )
+            y += line_height
+
+    pixels = np.array(canvas)
+    rgb = np.ascontiguousarray(pixels[..., :3])
+    alpha = pixels[..., 3].astype(np.float32) / 255.0
+    rgb.flags.writeable = False
+    alpha.flags.writeable = False
+    return rgb, alpha
+
+
+def caption_layer(text, size):
+    """
+    Caption overlay for an output frame size
+    Returns (rgb, alpha, (x, y)) or None when there is nothing to draw
+    """
+    text = ' '.join(text[:MAX_CAPTION_CHARS].split())
+    if not text:
+        return None
+
+    width, height = size
+    scale = height / 720
+    try:
+        rgb, alpha = rasterize_caption(
+            text,
+            round(CAPTION_FONT_SIZE * scale),
+            round(CAPTION_WIDTH * scale),
+            max(1, round(STROKE_WIDTH * scale)),
+            font_path()
+        )
+    except Exception as e:
+        print(f"Caption rendering error: {e}")
+        return None
+
+    # Centered horizontally, top edge at 80% of the frame height
+    return rgb, alpha, ((width - rgb.shape[1]) // 2, int(height * 0.8))
@@ -0,0 +1,197 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from groq import Groq
+from gtts import gTTS
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+# Connection pool, timeout and retry settings per external HTTP service
+SERVICES = {
+    'newsapi': {'timeout': (5, 15), 'retries': 2, 'pool_size': 4},
+    'pexels': {'timeout': (5, 15), 'retries': 2, 'pool_size': 16},
+    'pexels_cdn': {'timeout': (5, 30), 'retries': 3, 'pool_size': 16},
+}
+# Gemini errors worth another attempt, besides our own timeout
+GEMINI_RETRY_ERRORS = (
+    FutureTimeoutError,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    google_exceptions.ServiceUnavailable,
+)
+
+_sessions = {}
+_groq_clients = {}
+_gemini_models = {}
+_gemini_configured_key = None
+# Stand-ins installed with override_client (used by the benchmark harness)
+_overrides = {}
+_lock = threading.Lock()
+
+
+def override_client(name, client):
+    """
+    Replace the 'groq' client, the 'gemini' model factory or the 'gtts' engine
+    Pass None to go back to the real service
+    """
+    with _lock:
+        if client is None:
+            _overrides.pop(name, None)
+        else:
+            _overrides[name] = client
+
+
+class JitteredRetry(Retry):
+    """
+    urllib3 Retry with full jitter on the exponential backoff, so clients
+    that failed together do not retry in lockstep
+    """
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return random.uniform(0, backoff) if backoff > 0 else 0
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that applies a default timeout to every request without one
+    """
+
+    def __init__(self, *args, timeout=None, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def get_session(service):
+    """
+    Keep-alive requests session for an external service, created once per process
+    """
+    with _lock:
+        session = _sessions.get(service)
+        if session is None:
+            settings = SERVICES[service]
+            retry = JitteredRetry(
+                total=settings['retries'],
+                backoff_factor=0.5,
+                status_forcelist=(500, 502, 503, 504),
+                allowed_methods=('GET', 'HEAD'),
+                raise_on_status=False
+            )
+            adapter = TimeoutHTTPAdapter(
+                timeout=settings['timeout'],
+                max_retries=retry,
+                pool_connections=4,
+                pool_maxsize=settings['pool_size']
+            )
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers['User-Agent'] = 'Mozilla/5.0'
+            _sessions[service] = session
+        return session
+
+
+def get_groq_client():
+    """
+    Shared Groq client; its HTTP connection pool is reused across calls
+    """
+    if 'groq' in _overrides:
+        return _overrides['groq']
+
+    api_key = os.getenv('GROQ_API_KEY')
+
+    if not api_key:
+        raise Exception("GROQ_API_KEY not found in environment variables")
+
+    with _lock:
+        client = _groq_clients.get(api_key)
+        if client is None:
+            client = Groq(api_key=api_key, timeout=60.0, max_retries=2)
+            _groq_clients[api_key] = client
+        return client
+
+
+class TimeoutGeminiModel:
+    """
+    Gemini model whose generate_content gives up after `timeout` seconds and
+    retries timeouts and server errors with jittered exponential backoff,
+    like the HTTP sessions. The pinned SDK takes no deadline, so each call
+    runs on its own daemon thread that is abandoned when it times out.
+    """
+
+    def __init__(self, model, timeout, retries, backoff_factor=0.5):
+        self.model = model
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+
+    def generate_content(self, *args, **kwargs):
+        for attempt in range(self.retries + 1):
+            try:
+                return self._call(lambda: self.model.generate_content(*args, **kwargs))
+            except GEMINI_RETRY_ERRORS as e:
+                if attempt == self.retries:
+                    if isinstance(e, FutureTimeoutError):
+                        raise Exception(f"Gemini did not answer within {self.timeout:g}s")
+                    raise
+                time.sleep(random.uniform(0, self.backoff_factor * 2 ** attempt))
+
+    def _call(self, call):
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(call())
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name='gemini-call', daemon=True).start()
+        return future.result(timeout=self.timeout)
+
+
+def get_gemini_model(model_name, generation_config=None):
+    """
+    Shared Gemini model, configuring the SDK only when the API key changes
+    Calls time out after GEMINI_TIMEOUT seconds and are retried GEMINI_RETRIES times
+    """
+    global _gemini_configured_key
+    timeout = float(os.getenv('GEMINI_TIMEOUT', 30))
+    retries = int(os.getenv('GEMINI_RETRIES', 2))
+    if 'gemini' in _overrides:
+        return TimeoutGeminiModel(_overrides['gemini'](model_name, generation_config), timeout, retries)
+
+    api_key = os.getenv('GEMINI_API_KEY')
+
+    if not api_key:
+        raise Exception("GEMINI_API_KEY not found in environment variables")
+
+    key = (model_name, json.dumps(generation_config, sort_keys=True))
+    with _lock:
+        if api_key != _gemini_configured_key:
+            genai.configure(api_key=api_key)
+            _gemini_configured_key = api_key
+            _gemini_models.clear()
+
+        model = _gemini_models.get(key)
+        if model is None:
+            model = genai.GenerativeModel(model_name, generation_config=generation_config)
+            _gemini_models[key] = model
+    return TimeoutGeminiModel(model, timeout, retries)
+
+
+def speech_engine():
+    """
+    Text-to-speech class with gTTS's interface: engine(text=, lang=, slow=).save(path)
+    """
+    return _overrides.get('gtts', gTTS)
@@ -0,0 +1,72 @@
+import hashlib
+import json
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from modules.render_profiles import default_profile_name
+
+# Query parameters that only track where a click came from: every utm_*
+# parameter and these exact names, so e.g. 'reform' or 'refid' are kept
+TRACKING_PREFIX = 'utm_'
+TRACKING_PARAMS = frozenset(('fbclid', 'gclid', 'mc_cid', 'mc_eid', 'ref', 'cmpid'))
+
+
+def is_tracking_param(name):
+    name = name.lower()
+    return name.startswith(TRACKING_PREFIX) or name in TRACKING_PARAMS
+
+
+def normalize_url(url):
+    """
+    Canonical form of an article URL: lower-case scheme and host, no
+    fragment, tracking parameters or trailing slash, sorted query
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not is_tracking_param(name)
+    )
+    return urlunsplit(('https' if parts.scheme in ('http', 'https') else parts.scheme.lower(),
+                       host, parts.path.rstrip('/'), urlencode(query), ''))
+
+
+def article_identity(article):
+    """
+    What makes two clicks the same article: its URL, or its title when it
+    has none, or a hash of its description and content when both are missing
+    """
+    url = (article.get('url') or '').strip()
+    if url:
+        return 'url:' + normalize_url(url)
+    title = _normalize_text(article.get('title'))
+    if title:
+        return 'title:' + title
+    text = '\n'.join(_normalize_text(article.get(field)) for field in ('description', 'content'))
+    return 'text:' + hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _normalize_text(value):
+    return ' '.join((value or '').split()).casefold()
+
+
+def request_key(article, **options):
+    """
+    Key shared by generation requests that would produce the same video:
+    the article's identity plus the render options that change the output
+    """
+    identity = {'article': article_identity(article), 'options': options}
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def job_key(payload):
+    """
+    request_key of a generation job payload, as built by /api/generate-video
+    """
+    return request_key(
+        payload['article'],
+        deterministic=bool(payload.get('deterministic')),
+        profile=payload.get('profile') or default_profile_name(),
+        allow_downgrade=payload.get('allow_downgrade'),
+        preview=payload.get('preview')
+    )
@@ -0,0 +1,289 @@
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows; index writes are then atomic but not serialized
+    fcntl = None
+
+INDEX_FILE = 'index.json'
+LOCK_FILE = 'index.lock'
+# Access times are flushed to disk at most this often on read-only workloads
+INDEX_FLUSH_INTERVAL = 30
+
+
+class DiskCache:
+    """
+    Size-capped on-disk cache with LRU eviction and an optional TTL.
+
+    Every entry is one file in `directory`; `index.json` records its size,
+    creation time, last access and any metadata stored alongside it.
+    Several processes may share a directory: every flush merges the index
+    on disk with this process's changes under a file lock.
+    """
+
+    def __init__(self, directory, max_bytes, ttl=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+        self._index_path = os.path.join(directory, INDEX_FILE)
+        self._lock_path = os.path.join(directory, LOCK_FILE)
+        # key -> removal time of entries this process removed since its last flush
+        self._removed = {}
+        self._index_mtime = 0
+        self._last_flush = 0
+        self._dirty = False
+        os.makedirs(directory, exist_ok=True)
+        self._index = self._load_index()
+
+    def get(self, key):
+        """
+        Return the path of a live entry, or None on a miss
+        """
+        with self._lock:
+            self._reload_if_changed()
+            entry = self._index.get(key)
+            path = os.path.join(self.directory, entry['file']) if entry else None
+
+            if entry and self.ttl and time.time() - entry['created'] > self.ttl:
+                self._remove(key)
+                path = None
+            elif path and not os.path.exists(path):
+                del self._index[key]
+                self._removed[key] = time.time()
+                self._dirty = True
+                path = None
+
+            if path is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            entry['accessed'] = time.time()
+            self._dirty = True
+            self._flush(force=False)
+            return path
+
+    def get_meta(self, key):
+        with self._lock:
+            entry = self._index.get(key)
+            return dict(entry.get('meta') or {}) if entry else None
+
+    def get_json(self, key):
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self._remove(key)
+            return None
+
+    def put_file(self, key, source_path, suffix='', meta=None, move=False, link=False):
+        """
+        Store a copy of `source_path` (or move it in) and return the cached path
+        link: hard link instead of copying when both are on one filesystem;
+        `source_path` then stays valid even if the entry is evicted at once
+        """
+        filename = key + suffix
+        path = os.path.join(self.directory, filename)
+        partial = f'{path}.{threading.get_ident()}.part'
+
+        if move:
+            shutil.move(source_path, partial)
+        elif link:
+            try:
+                os.link(source_path, partial)
+            except OSError:
+                # Across filesystems
+                shutil.copyfile(source_path, partial)
+        else:
+            shutil.copyfile(source_path, partial)
+        os.replace(partial, path)
+        return self._record(key, filename, meta)
+
+    def put_bytes(self, key, data, suffix='', meta=None):
+        filename = key + suffix
+        path = os.path.join(self.directory, filename)
+        partial = f'{path}.{threading.get_ident()}.part'
+
+        with open(partial, 'wb') as f:
+            f.write(data)
+        os.replace(partial, path)
+        return self._record(key, filename, meta)
+
+    def put_json(self, key, value, meta=None):
+        return self.put_bytes(key, json.dumps(value).encode('utf-8'), suffix='.json', meta=meta)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._index),
+                'bytes': sum(entry['size'] for entry in self._index.values()),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+            }
+
+    def _record(self, key, filename, meta):
+        path = os.path.join(self.directory, filename)
+        now = time.time()
+        with self._lock:
+            self._reload_if_changed()
+            old = self._index.get(key)
+            if old and old['file'] != filename:
+                self._delete_file(old['file'])
+            self._index[key] = {
+                'file': filename,
+                'size': os.path.getsize(path),
+                'created': now,
+                'accessed': now,
+                'meta': meta or {},
+            }
+            self._flush(force=True)
+        return path
+
+    def _evict(self):
+        # Drop expired entries first, then least recently used ones until under the cap
+        now = time.time()
+        if self.ttl:
+            for key in [k for k, e in self._index.items() if now - e['created'] > self.ttl]:
+                self._remove(key)
+
+        total = sum(entry['size'] for entry in self._index.values())
+        if total <= self.max_bytes:
+            return
+
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]['accessed']):
+            if total <= self.max_bytes:
+                break
+            total -= entry['size']
+            self._remove(key)
+            self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._index.pop(key, None)
+        if entry:
+            self._delete_file(entry['file'])
+            self._removed[key] = time.time()
+            self._dirty = True
+
+    def _delete_file(self, filename):
+        try:
+            os.remove(os.path.join(self.directory, filename))
+        except OSError:
+            pass
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            self._index_mtime = os.path.getmtime(self._index_path)
+            return index
+        except (OSError, ValueError):
+            return {}
+
+    def _reload_if_changed(self):
+        # Pick up entries written by other processes sharing the directory
+        try:
+            mtime = os.path.getmtime(self._index_path)
+        except OSError:
+            return
+        if mtime > self._index_mtime:
+            self._merge(self._load_index())
+
+    def _merge(self, disk_index):
+        """
+        Combine the index on disk with this process's view of it
+        """
+        merged = {}
+        for key, entry in disk_index.items():
+            removed_at = self._removed.get(key)
+            if removed_at is not None and entry['created'] <= removed_at:
+                # Removed here after it was written there
+                continue
+            local = self._index.get(key)
+            if local and local['created'] > entry['created']:
+                entry = local
+            elif local:
+                entry = dict(entry, accessed=max(entry['accessed'], local['accessed']))
+            merged[key] = entry
+
+        for key, entry in self._index.items():
+            # Entries only known here are new unless another process evicted their file
+            if key not in merged and os.path.exists(os.path.join(self.directory, entry['file'])):
+                merged[key] = entry
+        self._index = merged
+
+    @contextmanager
+    def _index_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _flush(self, force):
+        if not self._dirty and not force:
+            return
+        if not force and time.time() - self._last_flush < INDEX_FLUSH_INTERVAL:
+            return
+
+        partial = f'{self._index_path}.{os.getpid()}.{threading.get_ident()}.part'
+        try:
+            with self._index_lock():
+                # Merge and evict over every process's entries, so max_bytes holds for the directory
+                self._merge(self._load_index())
+                self._evict()
+                with open(partial, 'w', encoding='utf-8') as f:
+                    json.dump(self._index, f)
+                os.replace(partial, self._index_path)
+                self._index_mtime = os.path.getmtime(self._index_path)
+        except OSError as e:
+            print(f"Warning: Failed to write cache index {self._index_path}: {e}")
+        self._removed = {}
+        self._dirty = False
+        self._last_flush = time.time()
+
+
+_shared_caches = {}
+_shared_caches_lock = threading.Lock()
+
+
+def shared_cache(prefix, default_dir, default_max_mb, default_ttl=None, ttl_setting='TTL', factory=None):
+    """
+    Process-wide cache configured from the <prefix>_CACHE_* settings (DIR,
+    MAX_MB and, when `default_ttl` is given, <ttl_setting>), or None when
+    <prefix>_CACHE_ENABLED is off
+    factory: callable(directory, max_bytes, ttl) building the cache, DiskCache by default
+    """
+    if os.getenv(f'{prefix}_CACHE_ENABLED', '1').lower() in ('0', 'false', 'no'):
+        return None
+
+    with _shared_caches_lock:
+        if prefix not in _shared_caches:
+            ttl = int(os.getenv(f'{prefix}_CACHE_{ttl_setting}', default_ttl)) if default_ttl else None
+            _shared_caches[prefix] = (factory or DiskCache)(
+                os.getenv(f'{prefix}_CACHE_DIR', os.path.join('cache', default_dir)),
+                int(os.getenv(f'{prefix}_CACHE_MAX_MB', default_max_mb)) * 1024 * 1024,
+                ttl
+            )
+        return _shared_caches[prefix]
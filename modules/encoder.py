@@ -0,0 +1,126 @@
+import os
+import subprocess
+import tempfile
+from moviepy.config import get_setting
+
+
+def encoder_settings():
+    """
+    libx264 settings from VIDEO_PRESET, VIDEO_CRF and VIDEO_THREADS (0 = auto)
+    """
+    return {
+        'preset': os.getenv('VIDEO_PRESET', 'medium'),
+        'crf': int(os.getenv('VIDEO_CRF', 23)),
+        'threads': int(os.getenv('VIDEO_THREADS', 0)),
+    }
+
+
+class FFmpegPipeEncoder:
+    """
+    Streams raw RGB frames into an ffmpeg process through its stdin.
+
+    Frames are written one at a time, so memory stays at a few frames
+    no matter how long the video is or what resolution it renders at.
+    Use as a context manager; a failed encode removes the partial output.
+    `on_frame(frames_written)` is called after every encoded frame.
+    """
+
+    def __init__(self, output_path, size, fps, audio_path=None,
+                 preset='medium', crf=23, threads=0, on_frame=None):
+        self.output_path = output_path
+        self.size = size
+        self.fps = fps
+        self.audio_path = audio_path
+        self.preset = preset
+        self.crf = crf
+        self.threads = threads
+        self.on_frame = on_frame
+        self.frames_written = 0
+        self._process = None
+        self._log = None
+
+    def command(self):
+        width, height = self.size
+        cmd = [
+            get_setting('FFMPEG_BINARY'), '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-vcodec', 'rawvideo',
+            '-pix_fmt', 'rgb24', '-s', f'{width}x{height}', '-r', str(self.fps),
+            '-i', '-',
+        ]
+        if self.audio_path:
+            cmd += ['-i', self.audio_path, '-map', '0:v', '-map', '1:a']
+        cmd += [
+            '-c:v', 'libx264', '-preset', self.preset, '-crf', str(self.crf),
+            '-threads', str(self.threads), '-pix_fmt', 'yuv420p',
+        ]
+        if self.audio_path:
+            cmd += ['-c:a', 'aac', '-shortest']
+        cmd += ['-movflags', '+faststart', self.output_path]
+        return cmd
+
+    def open(self):
+        # ffmpeg's log goes to a file so a chatty encoder can never block on a full pipe
+        self._log = tempfile.TemporaryFile()
+        self._process = subprocess.Popen(
+            self.command(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=self._log
+        )
+        return self
+
+    def write(self, frame):
+        """
+        Encode one HxWx3 uint8 frame
+        """
+        try:
+            self._process.stdin.write(frame.tobytes())
+        except (BrokenPipeError, OSError):
+            raise Exception(f"ffmpeg stopped accepting frames: {self._error_output()}")
+        self.frames_written += 1
+        if self.on_frame:
+            self.on_frame(self.frames_written)
+
+    def write_frames(self, frames):
+        for frame in frames:
+            self.write(frame)
+
+    def close(self):
+        """
+        Flush the remaining frames and wait for ffmpeg to finish the file
+        """
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        returncode = self._process.wait()
+        if returncode != 0:
+            raise Exception(f"ffmpeg exited with code {returncode}: {self._error_output()}")
+        self._log.close()
+
+    def abort(self):
+        if self._process and self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+        if self._log:
+            self._log.close()
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+    def _error_output(self):
+        self._log.seek(0)
+        return self._log.read().decode('utf-8', errors='replace').strip()[-2000:]
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is None:
+            try:
+                self.close()
+            except Exception:
+                self.abort()
+                raise
+        else:
+            self.abort()
+        return False
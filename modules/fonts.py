@@ -0,0 +1,90 @@
+import os
+import threading
+from functools import lru_cache
+from PIL import ImageFont
+
+# Tried in order; the first one that loads is used for every size
+FONT_CANDIDATES = [
+    'arial.ttf',
+    'Arial.ttf',
+    'DejaVuSans.ttf',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf',
+    '/System/Library/Fonts/Supplemental/Arial.ttf',
+    'C:/Windows/Fonts/arial.ttf',
+]
+
+# FreeType faces are shared between threads, so measuring and drawing
+# with a cached font goes through this lock
+font_lock = threading.RLock()
+
+
+@lru_cache(maxsize=1)
+def font_path():
+    """
+    Resolve the TrueType font once per process (FONT_PATH overrides the search)
+    Returns None when only Pillow's built-in bitmap font is available
+    """
+    candidates = [os.getenv('FONT_PATH')] + FONT_CANDIDATES
+    for candidate in candidates:
+        if not candidate:
+            continue
+        try:
+            ImageFont.truetype(candidate, 12)
+            return candidate
+        except OSError:
+            continue
+
+    print("Warning: No TrueType font found, using Pillow's default font")
+    return None
+
+
+@lru_cache(maxsize=32)
+def get_font(size):
+    path = font_path()
+    if path is None:
+        return ImageFont.load_default()
+    return ImageFont.truetype(path, size)
+
+
+@lru_cache(maxsize=32)
+def _glyph_widths(size):
+    return {}
+
+
+def text_width(text, size):
+    """
+    Width of `text` from cached per-glyph advances (kerning is ignored)
+    """
+    widths = _glyph_widths(size)
+    missing = set(text) - widths.keys()
+    if missing:
+        font = get_font(size)
+        with font_lock:
+            for char in missing:
+                widths[char] = font.getlength(char)
+    return sum(widths[char] for char in text)
+
+
+def wrap_text(text, size, max_width):
+    """
+    Greedy word wrap of `text` into lines no wider than `max_width`
+    """
+    space = text_width(' ', size)
+    lines = []
+    current_line = []
+    current_width = 0
+
+    for word in text.split():
+        width = text_width(word, size)
+        if current_line and current_width + space + width > max_width:
+            lines.append(' '.join(current_line))
+            current_line = []
+            current_width = 0
+        current_width += (space if current_line else 0) + width
+        current_line.append(word)
+
+    if current_line:
+        lines.append(' '.join(current_line))
+    return lines
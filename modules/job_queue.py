@@ -0,0 +1,315 @@
+import queue
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from modules.metrics import (
+    JOBS_COALESCED, JOBS_TOTAL, STAGE_CPU_SECONDS, STAGE_SECONDS, MemorySampler, Trace, cpu_seconds, tracing
+)
+
+# Pipeline stages reported for every job, in execution order
+STAGES = ['script', 'scenes', 'media', 'render']
+
+
+class QueueFullError(Exception):
+    """
+    Raised when a job is submitted while the queue is at capacity
+    """
+    pass
+
+
+class Job:
+    """
+    A single video generation request and its progress
+
+    Stage changes and anything passed to `emit` are published on the
+    queue's progress bus, when it has one. `trace` collects the job's
+    timing breakdown.
+    """
+
+    def __init__(self, payload, bus=None, estimates=None):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        # Identity used to coalesce duplicate requests, see JobQueue.submit
+        self.key = None
+        self.result_ttl = 0
+        self.status = 'queued'
+        self.stages = {stage: 'pending' for stage in STAGES}
+        self.current_stage = None
+        self.result = None
+        self.error = None
+        # Inputs kept after a preview so a full render can be promoted from them
+        self.artifacts = None
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.stage_times = {}
+        self.trace = Trace()
+        self._stage_started = {}
+        self._stage_cpu = {}
+        self._stage_memory = {}
+        self._bus = bus
+        self._estimates = estimates or {}
+        self._lock = threading.Lock()
+
+    def emit(self, event_type, **data):
+        """
+        Publish a progress event for this job
+        """
+        if self._bus is not None:
+            self._bus.publish(self.id, event_type, **data)
+
+    def start_stage(self, stage):
+        with self._lock:
+            self.stages[stage] = 'running'
+            self.current_stage = self._earliest_running()
+            self._stage_started[stage] = time.monotonic()
+            self._stage_cpu[stage] = cpu_seconds()
+            self._stage_memory[stage] = MemorySampler().start()
+            eta = self._remaining_estimate()
+        self.emit('stage_started', stage=stage, eta=eta)
+
+    def skip_stage(self, stage):
+        with self._lock:
+            self.stages[stage] = 'skipped'
+            self.current_stage = self._earliest_running()
+        self.emit('stage_skipped', stage=stage)
+
+    def finish_stage(self, stage):
+        with self._lock:
+            self.stages[stage] = 'done'
+            self.current_stage = self._earliest_running()
+            started = self._stage_started.get(stage)
+            elapsed = time.monotonic() - started if started is not None else 0.0
+            self.stage_times[stage] = elapsed
+            sampler = self._stage_memory.pop(stage, None)
+            eta = self._remaining_estimate()
+        # CPU time and memory are process-wide, so they overlap between concurrent stages and jobs
+        cpu_now = cpu_seconds()
+        cpu = cpu_now - self._stage_cpu.get(stage, cpu_now)
+        peak_rss = None
+        if sampler is not None:
+            sampler.stop()
+            # Without /proc only the lifetime peak is known, which says nothing about this stage
+            peak_rss = sampler.peak if sampler.sampled else None
+        self.trace.record_stage(stage, elapsed, cpu, peak_rss)
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        STAGE_CPU_SECONDS.inc(cpu, stage=stage)
+        self.emit('stage_finished', stage=stage, elapsed=round(elapsed, 3), eta=eta)
+
+    def stop_sampling(self):
+        """
+        Stop the memory samplers of stages that never finished, e.g. after a failure
+        """
+        with self._lock:
+            samplers = list(self._stage_memory.values())
+            self._stage_memory.clear()
+        for sampler in samplers:
+            sampler.stop()
+
+    def _earliest_running(self):
+        # Stages can overlap (scenes and media run together), so the job
+        # reports the earliest one still running until it finishes
+        return next((stage for stage in STAGES if self.stages[stage] == 'running'), None)
+
+    def _remaining_estimate(self):
+        # Seconds left from the average duration of stages that have not finished
+        if not self._estimates:
+            return None
+        now = time.monotonic()
+        remaining = 0.0
+        for stage in STAGES:
+            if self.stages[stage] in ('done', 'skipped'):
+                continue
+            estimate = self._estimates.get(stage, 0.0)
+            started = self._stage_started.get(stage)
+            if started is not None:
+                estimate = max(0.0, estimate - (now - started))
+            remaining += estimate
+        return round(remaining, 1)
+
+    def to_dict(self):
+        with self._lock:
+            data = {
+                'job_id': self.id,
+                'status': self.status,
+                'stage': self.current_stage,
+                'stages': dict(self.stages),
+                'created_at': self.created_at.isoformat(),
+                'started_at': self.started_at.isoformat() if self.started_at else None,
+                'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+                'timings': self.trace.to_dict(),
+            }
+            if self.result is not None:
+                data.update(self.result)
+            if self.error is not None:
+                data['error'] = self.error
+            return data
+
+
+class JobQueue:
+    """
+    Bounded job queue drained by a fixed pool of worker threads.
+
+    `handler(job)` runs the pipeline for one job and returns a dict that is
+    merged into the job status once the job has finished. With a progress
+    `bus`, job lifecycle and stage events are published on it.
+
+    Jobs submitted with a key are single-flight: a request whose key matches
+    a queued or running job attaches to it, and one that matches a job
+    completed less than `result_ttl` seconds ago gets that job back.
+    """
+
+    def __init__(self, handler, workers=2, max_queue=8, history=200, bus=None, result_ttl=300):
+        self.handler = handler
+        self.bus = bus
+        self.workers = max(1, int(workers))
+        self.max_queue = max(1, int(max_queue))
+        self.history = history
+        self.result_ttl = result_ttl
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._jobs = OrderedDict()
+        # key -> job for keyed jobs that are queued, running or recently completed
+        self._by_key = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._running = 0
+        # Moving average of each stage's duration, used for job ETAs
+        self._stage_estimates = {}
+
+    def start(self):
+        """
+        Start the worker threads (safe to call more than once)
+        """
+        with self._lock:
+            if self._threads:
+                return
+            for n in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f'render-worker-{n}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, payload, key=None):
+        """
+        Queue a new job and return it without waiting for it to run
+        """
+        job, coalesced = self.submit_once(payload, key)
+        return job
+
+    def submit_once(self, payload, key=None, result_ttl=None):
+        """
+        Queue a job unless one with the same `key` is in flight or recently completed
+        Returns (job, coalesced); coalesced is True when an existing job was returned
+        result_ttl: how long this job's result is reused, defaults to the queue's
+        """
+        self.start()
+        with self._lock:
+            existing = self._find(key)
+            if existing is not None:
+                JOBS_COALESCED.inc(status=existing.status)
+                return existing, True
+
+            job = Job(payload, bus=self.bus, estimates=dict(self._stage_estimates))
+            job.key = key
+            job.result_ttl = self.result_ttl if result_ttl is None else result_ttl
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise QueueFullError(f"Job queue is full ({self.max_queue} jobs waiting)")
+            self._jobs[job.id] = job
+            if key is not None:
+                self._by_key[key] = job
+            self._trim_history()
+        job.emit('job_queued', position=self._queue.qsize())
+        return job, False
+
+    def _find(self, key):
+        # The live or recently completed job for `key`, dropping stale entries
+        job = self._by_key.get(key) if key is not None else None
+        if job is None:
+            return None
+        if job.status in ('queued', 'running'):
+            return job
+        if job.status == 'completed' and (
+            job.finished_at is None or (datetime.now() - job.finished_at).total_seconds() < job.result_ttl
+        ):
+            return job
+        del self._by_key[key]
+        return None
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def find(self, key):
+        """
+        The queued, running or reusable completed job for `key`, or None
+        """
+        with self._lock:
+            return self._find(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'running': self._running,
+                'queued': self._queue.qsize(),
+                'max_queue': self.max_queue,
+                'coalescing': len(self._by_key),
+            }
+
+    def _trim_history(self):
+        # Forget the oldest finished jobs once the history limit is reached
+        excess = len(self._jobs) - self.history
+        if excess <= 0:
+            return
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in ('completed', 'failed')]
+        for job_id in finished[:excess]:
+            job = self._jobs.pop(job_id)
+            if job.key is not None and self._by_key.get(job.key) is job:
+                del self._by_key[job.key]
+            if self.bus is not None:
+                self.bus.forget(job_id)
+
+    def _record_stage_times(self, job):
+        for stage, elapsed in job.stage_times.items():
+            previous = self._stage_estimates.get(stage)
+            self._stage_estimates[stage] = elapsed if previous is None else 0.7 * previous + 0.3 * elapsed
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                self._running += 1
+            job.status = 'running'
+            job.started_at = datetime.now()
+            job.emit('job_started')
+
+            try:
+                with tracing(job.trace):
+                    job.result = self.handler(job)
+                job.status = 'completed'
+            except Exception as e:
+                print(f"Job {job.id} failed: {str(e)}")
+                traceback.print_exc()
+                job.error = str(e)
+                job.status = 'failed'
+            finally:
+                job.stop_sampling()
+                job.finished_at = datetime.now()
+                JOBS_TOTAL.inc(status=job.status)
+                with self._lock:
+                    self._running -= 1
+                    if job.status == 'completed':
+                        self._record_stage_times(job)
+                    elif job.key is not None and self._by_key.get(job.key) is job:
+                        # Let the next identical request retry instead of sharing the failure
+                        del self._by_key[job.key]
+                self._queue.task_done()
+
+            if job.status == 'completed':
+                job.emit('job_completed', video_url=(job.result or {}).get('video_url'))
+            else:
+                job.emit('job_failed', error=job.error)
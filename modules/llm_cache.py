@@ -0,0 +1,51 @@
+import hashlib
+import json
+import os
+from modules.disk_cache import shared_cache
+
+
+def deterministic_default():
+    """
+    Whether LLM calls run in deterministic, memoized mode unless a request says otherwise
+    """
+    return os.getenv('LLM_DETERMINISTIC', '0').lower() in ('1', 'true', 'yes')
+
+
+def llm_cache_key(model, prompt, params):
+    """
+    Hash of the model name, prompt and sampling parameters of a call
+    """
+    identity = {
+        'model': model,
+        'prompt': hashlib.sha256(prompt.encode('utf-8')).hexdigest(),
+        'params': params,
+    }
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def get_llm_cache():
+    """
+    Process-wide cache of LLM responses, or None when LLM_CACHE_ENABLED is off
+    """
+    return shared_cache('LLM', 'llm', 64, default_ttl=24 * 3600)
+
+
+def memoized(model, prompt, params, call, validate=None):
+    """
+    Return the cached response text for this call, or run `call()` and store it
+    validate: optional check that raises for responses that must not be cached
+    """
+    cache = get_llm_cache()
+    if cache is None:
+        return call()
+
+    key = llm_cache_key(model, prompt, params)
+    cached = cache.get_json(key)
+    if cached is not None:
+        return cached['text']
+
+    text = call()
+    if validate:
+        validate(text)
+    cache.put_json(key, {'text': text})
+    return text
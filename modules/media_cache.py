@@ -0,0 +1,99 @@
+import hashlib
+import os
+import re
+import shutil
+from modules.disk_cache import DiskCache, shared_cache
+
+
+def normalize_query(query):
+    """
+    Normalize a search query so trivially different spellings share a cache entry
+    """
+    query = re.sub(r'[^\w\s]', ' ', query.lower())
+    return ' '.join(query.split())
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def place_file(source_path, target_path):
+    """
+    Hard link a cached file into a job folder, copying across filesystems
+    """
+    if os.path.exists(target_path):
+        os.remove(target_path)
+    try:
+        os.link(source_path, target_path)
+    except OSError:
+        shutil.copyfile(source_path, target_path)
+    return target_path
+
+
+class MediaCache:
+    """
+    Persistent cache for Pexels search results and downloaded assets.
+
+    Search results are keyed by normalized query and expire after a TTL.
+    Assets are stored once by content hash, with a small URL -> hash map so a
+    result that was downloaded before is never fetched again.
+    """
+
+    def __init__(self, directory, max_bytes, search_ttl):
+        self.searches = DiskCache(os.path.join(directory, 'searches'), max_bytes=32 * 1024 * 1024, ttl=search_ttl)
+        self.urls = DiskCache(os.path.join(directory, 'urls'), max_bytes=16 * 1024 * 1024)
+        self.assets = DiskCache(os.path.join(directory, 'assets'), max_bytes=max_bytes)
+
+    @staticmethod
+    def search_key(endpoint, query, params):
+        extra = '&'.join(f'{k}={params[k]}' for k in sorted(params) if k != 'query')
+        raw = f'{endpoint}|{normalize_query(query)}|{extra}'
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def url_key(url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def get_search(self, endpoint, query, params):
+        return self.searches.get_json(self.search_key(endpoint, query, params))
+
+    def put_search(self, endpoint, query, params, data):
+        self.searches.put_json(self.search_key(endpoint, query, params), data)
+
+    def get_asset(self, url):
+        """
+        Return the cached file for a download URL, or None
+        """
+        entry = self.urls.get_json(self.url_key(url))
+        if not entry:
+            return None
+        return self.assets.get(entry['sha256'])
+
+    def put_asset(self, url, path):
+        """
+        Store a downloaded file by content hash and remember its source URL
+        """
+        sha256 = file_sha256(path)
+        cached_path = self.assets.put_file(sha256, path, suffix=os.path.splitext(path)[1])
+        self.urls.put_json(self.url_key(url), {'sha256': sha256})
+        return cached_path
+
+    def stats(self):
+        return {
+            'searches': self.searches.stats(),
+            'assets': self.assets.stats(),
+        }
+
+
+def get_media_cache():
+    """
+    Process-wide media cache configured from MEDIA_CACHE_* settings,
+    or None when MEDIA_CACHE_ENABLED is off
+    """
+    return shared_cache(
+        'MEDIA', 'media', 1024, default_ttl=24 * 3600, ttl_setting='SEARCH_TTL', factory=MediaCache
+    )
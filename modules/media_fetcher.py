@@ -1,109 +1,372 @@
-import requests
+import io
 import os
-from urllib.request import urlretrieve
+import threading
 import time
-from PIL import Image, ImageDraw, ImageFont
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import numpy as np
+from PIL import Image, ImageDraw
+from modules.fonts import font_lock, get_font, text_width, wrap_text
+from modules.media_cache import get_media_cache, place_file
+from modules.clients import get_session
+from modules.metrics import bind, external_call
+from modules.render_profiles import get_profile
 
-def create_fallback_image(text, scene_number, temp_folder):
+# Gradient backgrounds for fallback images
+FALLBACK_COLORS = [
+    ((41, 128, 185), (142, 68, 173)),   # Blue to Purple
+    ((52, 152, 219), (46, 204, 113)),   # Blue to Green
+    ((155, 89, 182), (52, 73, 94)),     # Purple to Dark
+    ((230, 126, 34), (231, 76, 60)),    # Orange to Red
+]
+FALLBACK_SIZE = (1280, 720)
+
+
+@lru_cache(maxsize=len(FALLBACK_COLORS))
+def fallback_gradient(color_index):
     """
-    Create a visually appealing fallback image when API fails
+    Vertical gradient background, built once per color pair
     """
-    # Create gradient background
-    colors = [
-        ((41, 128, 185), (142, 68, 173)),   # Blue to Purple
-        ((52, 152, 219), (46, 204, 113)),   # Blue to Green
-        ((155, 89, 182), (52, 73, 94)),     # Purple to Dark
-        ((230, 126, 34), (231, 76, 60)),    # Orange to Red
-    ]
-    
-    color_pair = colors[scene_number % len(colors)]
-    
-    # Create image with gradient
-    img = Image.new('RGB', (1280, 720))
+    width, height = FALLBACK_SIZE
+    start, end = (np.array(color, dtype=np.float32) for color in FALLBACK_COLORS[color_index])
+    ramp = np.arange(height, dtype=np.float32)[:, None] / height
+    rows = (start + (end - start) * ramp).astype(np.uint8)
+    gradient = np.ascontiguousarray(np.broadcast_to(rows[:, None, :], (height, width, 3)))
+    gradient.flags.writeable = False
+    return gradient
+
+
+@lru_cache(maxsize=64)
+def render_fallback_image(text, scene_number):
+    """
+    Encoded JPEG of a fallback image; repeated scenes are served from memory
+    """
+    width, height = FALLBACK_SIZE
+    img = Image.fromarray(fallback_gradient(scene_number % len(FALLBACK_COLORS)))
     draw = ImageDraw.Draw(img)
     
-    # Simple gradient
-    for y in range(720):
-        r = int(color_pair[0][0] + (color_pair[1][0] - color_pair[0][0]) * y / 720)
-        g = int(color_pair[0][1] + (color_pair[1][1] - color_pair[0][1]) * y / 720)
-        b = int(color_pair[0][2] + (color_pair[1][2] - color_pair[0][2]) * y / 720)
-        draw.line([(0, y), (1280, y)], fill=(r, g, b))
-    
-    # Add text
-    try:
-        font_large = ImageFont.truetype("arial.ttf", 60)
-        font_small = ImageFont.truetype("arial.ttf", 40)
-    except:
-        try:
-            font_large = ImageFont.truetype("Arial.ttf", 60)
-            font_small = ImageFont.truetype("Arial.ttf", 40)
-        except:
-            font_large = ImageFont.load_default()
-            font_small = ImageFont.load_default()
-    
     # Scene number
     scene_text = f"Scene {scene_number + 1}"
     
     # Wrap text to multiple lines
-    words = text.split()
-    lines = []
-    current_line = []
-    
-    for word in words:
-        current_line.append(word)
-        test_line = ' '.join(current_line)
-        try:
-            bbox = draw.textbbox((0, 0), test_line, font=font_small)
-            width = bbox[2] - bbox[0]
-        except:
-            width, _ = draw.textsize(test_line, font=font_small)
-        
-        if width > 1100:
-            current_line.pop()
-            lines.append(' '.join(current_line))
-            current_line = [word]
+    lines = wrap_text(text, 40, 1100)
     
-    if current_line:
-        lines.append(' '.join(current_line))
+    font_large = get_font(60)
+    font_small = get_font(40)
     
-    # Draw scene number
-    try:
-        bbox = draw.textbbox((0, 0), scene_text, font=font_large)
-        text_width = bbox[2] - bbox[0]
-    except:
-        text_width, _ = draw.textsize(scene_text, font=font_large)
-    
-    draw.text(((1280 - text_width) // 2, 100), scene_text, fill='white', font=font_large)
-    
-    # Draw wrapped text
-    y_offset = 300
-    for line in lines[:3]:  # Max 3 lines
-        try:
-            bbox = draw.textbbox((0, 0), line, font=font_small)
-            text_width = bbox[2] - bbox[0]
-        except:
-            text_width, _ = draw.textsize(line, font=font_small)
+    with font_lock:
+        # Draw scene number
+        text_w = text_width(scene_text, 60)
+        draw.text(((width - text_w) // 2, 100), scene_text, fill='white', font=font_large)
         
-        draw.text(((1280 - text_width) // 2, y_offset), line, fill='white', font=font_small)
-        y_offset += 60
+        # Draw wrapped text
+        y_offset = 300
+        for line in lines[:3]:  # Max 3 lines
+            text_w = text_width(line, 40)
+            draw.text(((width - text_w) // 2, y_offset), line, fill='white', font=font_small)
+            y_offset += 60
     
-    # Save image
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def create_fallback_image(text, scene_number, temp_folder):
+    """
+    Create a visually appealing fallback image when API fails
+    """
     filename = f'{temp_folder}/fallback_scene_{scene_number}.jpg'
-    img.save(filename, quality=85)
+    with open(filename, 'wb') as f:
+        f.write(render_fallback_image(text, scene_number))
+    return filename
+
+
+# PEXELS_API_BASE points the client at another server, e.g. the benchmark fakes
+PEXELS_API_BASE = os.getenv('PEXELS_API_BASE', 'https://api.pexels.com').rstrip('/')
+PEXELS_SEARCH_URL = f'{PEXELS_API_BASE}/v1/search'
+PEXELS_VIDEO_SEARCH_URL = f'{PEXELS_API_BASE}/videos/search'
+# Get 3 landscape results per scene to have options
+SEARCH_PARAMS = {'per_page': 3, 'orientation': 'landscape'}
+VIDEO_SEARCH_PARAMS = {'per_page': 3, 'orientation': 'landscape'}
+# Scenes analyzed as 'video' get a Pexels clip unless PEXELS_VIDEOS is off
+PEXELS_VIDEOS = os.getenv('PEXELS_VIDEOS', '1').lower() not in ('0', 'false', 'no')
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class RateLimitedError(Exception):
+    """
+    Raised instead of sleeping when the Pexels quota is out for longer than the limiter may wait
+    """
+    pass
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every Pexels API call in this process.
+    Follows the X-Ratelimit-* headers Pexels sends back so we slow down
+    before the quota runs out instead of after a 429.
+
+    After a 429 callers wait at most `max_wait` seconds; a longer block
+    (Pexels resets its quota monthly) fails fast with RateLimitedError so
+    scenes fall back to generated images instead of holding a worker.
+    """
+
+    def __init__(self, rate, burst, max_wait=5):
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a request may be sent
+        Raises RateLimitedError when that is more than max_wait seconds away
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                    if wait > self.max_wait:
+                        raise RateLimitedError(f"Pexels rate limit reached, quota resets in {wait:.0f}s")
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def update(self, response):
+        """
+        Adjust the bucket from the rate limit headers of an API response
+        """
+        remaining = response.headers.get('X-Ratelimit-Remaining')
+        reset = response.headers.get('X-Ratelimit-Reset')
+        retry_after = response.headers.get('Retry-After')
+
+        with self.lock:
+            if remaining is not None:
+                try:
+                    self.tokens = min(self.tokens, float(remaining))
+                except ValueError:
+                    pass
+
+            # Out of quota: nothing is sent until Retry-After or the window
+            # reset; acquire() only waits for blocks up to max_wait
+            if response.status_code == 429 or remaining == '0':
+                try:
+                    wait = float(retry_after) if retry_after is not None else max(0, float(reset) - time.time())
+                except (TypeError, ValueError):
+                    wait = 60
+                self.blocked_until = time.monotonic() + min(wait, 3600)
+
+
+# Result of the last Pexels connection test, shared by every job
+PEXELS_HEALTH_TTL = int(os.getenv('PEXELS_HEALTH_TTL', 300))
+PEXELS_HEALTH_RETRY = 60
+_pexels_health = {'api_key': None, 'headers': None, 'checked_at': None, 'checking': False}
+_pexels_health_lock = threading.Lock()
+_pexels_health_checked = threading.Condition(_pexels_health_lock)
+
+pexels_limiter = RateLimiter(
+    rate=float(os.getenv('PEXELS_RATE_PER_SEC', 2)),
+    burst=int(os.getenv('PEXELS_RATE_BURST', 4)),
+    max_wait=float(os.getenv('PEXELS_RATE_MAX_WAIT', 5))
+)
+
+def pexels_get(url, headers, params, timeout=10):
+    """
+    Rate limited GET against the Pexels API
+    """
+    pexels_limiter.acquire()
+    with external_call('pexels'):
+        response = get_session('pexels').get(url, headers=headers, params=params, timeout=timeout)
+    pexels_limiter.update(response)
+    return response
+
+
+def pexels_search(url, headers, params):
+    """
+    pexels_get for a search, sent once more after a 429: the limiter holds
+    the retry for a short Retry-After, and raises RateLimitedError when the
+    quota is out for longer
+    """
+    response = pexels_get(url, headers, params)
+    if response.status_code == 429:
+        print(f"  Pexels rate limit hit, retrying '{params.get('query')}'")
+        response = pexels_get(url, headers, params)
+    return response
+
+
+def download_file(url, filename):
+    """
+    Stream a file to disk in chunks, only moving it into place once complete
+    """
+    partial = f'{filename}.part'
+    with external_call('pexels_cdn'), get_session('pexels_cdn').get(url, stream=True) as response:
+        response.raise_for_status()
+        with open(partial, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+    os.replace(partial, filename)
     return filename
 
 
-def fetch_media(scenes):
+def fetch_media(scenes, workspace=None, target_size=None):
     """
     Fetch media files from Pexels API based on scene keywords
     With robust fallback system
+    workspace: job Workspace that downloads are written to
+    target_size: output size that video clips are picked for
+    """
+    with MediaFetcher(workspace, max_workers=len(scenes), target_size=target_size) as fetcher:
+        futures = [fetcher.submit(idx, scene) for idx, scene in enumerate(scenes)]
+        return [future.result() for future in futures]
+
+
+class MediaFetcher:
+    """
+    Fetches media for scenes as they are submitted, so a scene can be
+    downloading while later scenes are still being analyzed.
+
+    Each scene is served from the media cache when possible; only cache
+    misses consult the shared Pexels health check.
+
+    on_progress: optional callback(event_type, **data), called with a
+    scene_media event as each scene's media becomes ready
+    target_size: output size that video clips are picked for, defaults to
+    the default render profile's
+    """
+
+    def __init__(self, workspace=None, max_workers=None, on_progress=None, target_size=None):
+        self.temp_folder = workspace.path if workspace else 'temp'
+        self.target_size = target_size or get_profile()['size']
+        os.makedirs(self.temp_folder, exist_ok=True)
+        self.cache = get_media_cache()
+        self.on_progress = on_progress
+        
+        # Search and download scenes concurrently; the rate limiter
+        # replaces the old fixed delay between scenes
+        max_workers = max(1, min(int(os.getenv('MEDIA_FETCH_CONCURRENCY', 4)), max_workers or 4))
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='media-fetch')
+
+    def submit(self, idx, scene):
+        """
+        Start fetching one scene's media; returns a future of its media entry
+        """
+        return self.executor.submit(bind(self._fetch), idx, scene)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+        return False
+
+    def _fetch(self, idx, scene):
+        started = time.monotonic()
+        media, source = self._resolve(idx, scene)
+        if self.on_progress:
+            self.on_progress(
+                'scene_media',
+                scene=idx,
+                source=source,
+                elapsed=round(time.monotonic() - started, 3)
+            )
+        return media
+
+    def _resolve(self, idx, scene):
+        # Returns (media, source) where source is cache, pexels or fallback
+        if PEXELS_VIDEOS and scene.get('media_type') == 'video':
+            media, source = self._resolve_video(idx, scene)
+            if media:
+                return media, source
+            print(f"  Scene {idx}: No video clip, searching photos instead")
+
+        search_data = None
+        if self.cache:
+            media, search_data = fetch_cached_scene_media(idx, scene, self.temp_folder, self.cache)
+            if media:
+                return media, 'cache'
+        
+        headers = pexels_api_headers()
+        if headers is None:
+            print(f"  Scene {idx}: Creating fallback image...")
+            return fallback_media(idx, scene, self.temp_folder), 'fallback'
+        
+        media = fetch_scene_media(idx, scene, headers, self.temp_folder, self.cache, search_data)
+        fallback = os.path.basename(media['path']).startswith('fallback_scene')
+        return media, 'fallback' if fallback else 'pexels'
+
+    def _resolve_video(self, idx, scene):
+        # Returns (media, source), media is None when no clip could be found
+        search_data = None
+        if self.cache:
+            media, search_data = fetch_cached_scene_video(idx, scene, self.temp_folder, self.cache, self.target_size)
+            if media:
+                return media, 'cache'
+
+        headers = pexels_api_headers()
+        if headers is None:
+            return None, None
+        media = fetch_scene_video(idx, scene, headers, self.temp_folder, self.target_size, self.cache, search_data)
+        return media, 'pexels'
+
+
+def pexels_api_headers():
+    """
+    Cached Pexels health check: the request headers, or None when the API
+    cannot be used. A healthy result is trusted for PEXELS_HEALTH_TTL
+    seconds, a failed one is re-checked sooner.
+    """
+    api_key = os.getenv('PEXELS_API_KEY')
+    now = time.monotonic()
+    
+    with _pexels_health_lock:
+        while True:
+            ttl = PEXELS_HEALTH_TTL if _pexels_health['headers'] else PEXELS_HEALTH_RETRY
+            checked_at = _pexels_health['checked_at']
+            known = checked_at is not None and _pexels_health['api_key'] == api_key
+            if known and (now - checked_at <= ttl or _pexels_health['checking']):
+                # Fresh, or being re-checked: the last result serves meanwhile
+                return _pexels_health['headers']
+            if not _pexels_health['checking']:
+                break
+            # First check of this key is running; wait for it without holding the lock
+            _pexels_health_checked.wait()
+        _pexels_health['checking'] = True
+
+    # The check goes through the rate limiter, so it runs outside the lock
+    headers = None
+    try:
+        headers = check_pexels_api()
+    finally:
+        with _pexels_health_lock:
+            _pexels_health.update(headers=headers, api_key=api_key, checked_at=time.monotonic(), checking=False)
+            _pexels_health_checked.notify_all()
+    return headers
+
+
+def check_pexels_api():
+    """
+    Validate the Pexels API key and connection
+    Returns the request headers, or None if fallbacks should be used
     """
     api_key = os.getenv('PEXELS_API_KEY')
     
     if not api_key:
         print("PEXELS_API_KEY not found in environment variables")
-        print("Creating fallback images for all scenes...")
-        return create_all_fallbacks(scenes)
+        print("Creating fallback images for remaining scenes...")
+        return None
     
     # Clean API key (remove any whitespace or quotes)
     api_key = api_key.strip().strip('"').strip("'")
@@ -113,22 +376,17 @@ def fetch_media(scenes):
     # Correct header format
     headers = {'Authorization': api_key}
     
-    media_files = []
-    temp_folder = 'temp'
-    os.makedirs(temp_folder, exist_ok=True)
-    
     # Test API connection first
     print("Testing Pexels API connection...")
-    test_url = 'https://api.pexels.com/v1/search'
     test_params = {'query': 'technology', 'per_page': 1}
     
     try:
-        test_response = requests.get(test_url, headers=headers, params=test_params, timeout=5)
+        test_response = pexels_get(PEXELS_SEARCH_URL, headers, test_params, timeout=5)
         if test_response.status_code == 403:
             print("Pexels API returned 403 Forbidden - Invalid API key")
             print("Please check your API key at https://www.pexels.com/api/")
             print("Creating fallback images instead...")
-            return create_all_fallbacks(scenes)
+            return None
         elif test_response.status_code == 200:
             print("Pexels API connection successful")
         else:
@@ -136,113 +394,253 @@ def fetch_media(scenes):
     except Exception as e:
         print(f"API test failed: {e}")
         print("Creating fallback images...")
-        return create_all_fallbacks(scenes)
+        return None
     
-    # Process each scene
-    for idx, scene in enumerate(scenes):
-        keywords = scene.get('search_keywords', ['news'])
-        
-        # Improve search query - use more generic terms if keywords are too long
-        search_terms = []
-        for keyword in keywords[:3]:
-            # Clean up the keyword (remove partial text)
-            if len(keyword) > 30:
-                # Keyword seems truncated, use generic term
-                continue
-            search_terms.append(keyword)
-        
-        # Fallback to visual description if no good keywords
-        if not search_terms:
-            visual_desc = scene.get('visual_description', 'business news')
-            # Extract first few words
-            search_terms = visual_desc.split()[:3]
-        
-        search_query = ' '.join(search_terms)
-        media_type = scene.get('media_type', 'photo')
-        
-        print(f"\nScene {idx}: Searching for '{search_query}' ({media_type})")
-        
-        # Add delay to avoid rate limiting
-        if idx > 0:
-            time.sleep(1.5)
-        
-        success = False
+    return headers
+
+
+def fetch_cached_scene_media(idx, scene, temp_folder, cache):
+    """
+    Resolve a scene entirely from the media cache
+    Returns (media, search_data); media is None unless an image was cached
+    """
+    search_query = build_search_query(scene)
+    data = cache.get_search(PEXELS_SEARCH_URL, search_query, SEARCH_PARAMS)
+    
+    for photo in (data or {}).get('photos', [])[:3]:
+        image_url = photo['src'].get('large', photo['src']['medium'])
+        cached_path = cache.get_asset(image_url)
+        if cached_path:
+            filename = f'{temp_folder}/scene_{idx}_image.jpg'
+            place_file(cached_path, filename)
+            print(f"Scene {idx}: Using cached image for '{search_query}'")
+            return {
+                'scene_number': scene.get('scene_number'),
+                'path': filename,
+                'type': 'image'
+            }, data
+    
+    return None, data
+
+
+def build_search_query(scene):
+    """
+    Turn a scene's keywords into a Pexels search query
+    """
+    keywords = scene.get('search_keywords', ['news'])
+    
+    # Improve search query - use more generic terms if keywords are too long
+    search_terms = []
+    for keyword in keywords[:3]:
+        # Clean up the keyword (remove partial text)
+        if len(keyword) > 30:
+            # Keyword seems truncated, use generic term
+            continue
+        search_terms.append(keyword)
+    
+    # Fallback to visual description if no good keywords
+    if not search_terms:
+        visual_desc = scene.get('visual_description', 'business news')
+        # Extract first few words
+        search_terms = visual_desc.split()[:3]
+    
+    return ' '.join(search_terms)
+
+
+def fetch_scene_media(idx, scene, headers, temp_folder, cache=None, search_data=None):
+    """
+    Search and download the image for one scene, falling back to a
+    generated image if nothing could be downloaded
+    search_data: cached search results, used instead of a new search
+    """
+    search_query = build_search_query(scene)
+    media_type = scene.get('media_type', 'photo')
+    
+    print(f"Scene {idx}: Searching for '{search_query}' ({media_type})")
+    
+    success = False
+    filename = f'{temp_folder}/scene_{idx}_image.jpg'
+    
+    try:
+        data = search_data
+        status_code = 200
         
-        try:
+        if data is None:
             # Try photo search (more reliable than video)
-            url = 'https://api.pexels.com/v1/search'
-            params = {
-                'query': search_query,
-                'per_page': 3,  # Get 3 results to have options
-                'orientation': 'landscape'
-            }
-            
-            response = requests.get(url, headers=headers, params=params, timeout=10)
+            params = {'query': search_query, **SEARCH_PARAMS}
+            response = pexels_search(PEXELS_SEARCH_URL, headers, params)
+            status_code = response.status_code
             
-            if response.status_code == 200:
+            if status_code == 200:
                 data = response.json()
+                if cache:
+                    cache.put_search(PEXELS_SEARCH_URL, search_query, SEARCH_PARAMS, data)
+            elif status_code == 403:
+                print(f"  Response: {response.text}")
+        
+        if status_code == 200:
+            if data.get('photos') and len(data['photos']) > 0:
+                # Try each photo until one downloads successfully
+                for photo_idx, photo in enumerate(data['photos'][:3]):
+                    try:
+                        image_url = photo['src'].get('large', photo['src']['medium'])
+                        print(f"  Scene {idx}: Downloading image (attempt {photo_idx + 1})...")
+                        
+                        # Assets were already looked up when the search came from the cache
+                        cached_path = cache.get_asset(image_url) if cache and search_data is None else None
+                        if cached_path:
+                            place_file(cached_path, filename)
+                        else:
+                            download_file(image_url, filename)
+                        
+                        # Verify image was downloaded
+                        if os.path.exists(filename) and os.path.getsize(filename) > 0:
+                            print(f"  Scene {idx}: Downloaded successfully")
+                            if cache and not cached_path:
+                                cache.put_asset(image_url, filename)
+                            success = True
+                            break
+                    except Exception as download_error:
+                        print(f"  Scene {idx}: Download attempt {photo_idx + 1} failed: {download_error}")
+                        continue
                 
-                if data.get('photos') and len(data['photos']) > 0:
-                    # Try each photo until one downloads successfully
-                    for photo_idx, photo in enumerate(data['photos'][:3]):
-                        try:
-                            image_url = photo['src'].get('large', photo['src']['medium'])
-                            filename = f'{temp_folder}/scene_{idx}_image.jpg'
-                            print(f"  Downloading image (attempt {photo_idx + 1})...")
-                            
-                            img_response = requests.get(image_url, headers={'User-Agent': 'Mozilla/5.0'})
-                            with open(filename, 'wb') as f:
-                                f.write(img_response.content)
-                            
-                            # Verify image was downloaded
-                            if os.path.exists(filename) and os.path.getsize(filename) > 0:
-                                print(f"  Downloaded successfully")
-                                media_files.append({
-                                    'scene_number': scene.get('scene_number'),
-                                    'path': filename,
-                                    'type': 'image'
-                                })
-                                success = True
-                                break
-                        except Exception as download_error:
-                            print(f"  Download attempt {photo_idx + 1} failed: {download_error}")
-                            continue
-                    
-                    if not success:
-                        print(f"  All download attempts failed")
-                else:
-                    print(f"  No photos found for query")
+                if not success:
+                    print(f"  Scene {idx}: All download attempts failed")
             else:
-                print(f"  API returned status {response.status_code}")
-                if response.status_code == 403:
-                    print(f"  Response: {response.text}")
-                    
-        except Exception as e:
-            print(f"  Error: {str(e)}")
-        
-        # Create fallback if download failed
-        if not success:
-            print(f"  Creating fallback image...")
-            fallback_path = create_fallback_image(
-                scene.get('visual_description', 'Scene'),
-                idx,
-                temp_folder
-            )
-            media_files.append({
-                'scene_number': scene.get('scene_number'),
-                'path': fallback_path,
-                'type': 'image'
-            })
+                print(f"  Scene {idx}: No photos found for query")
+        else:
+            print(f"  Scene {idx}: API returned status {status_code}")
+                
+    except Exception as e:
+        print(f"  Scene {idx}: Error: {str(e)}")
     
-    return media_files
+    if success:
+        return {
+            'scene_number': scene.get('scene_number'),
+            'path': filename,
+            'type': 'image'
+        }
+    
+    # Create fallback if download failed
+    print(f"  Scene {idx}: Creating fallback image...")
+    return fallback_media(idx, scene, temp_folder)
+
+
+def pick_video_file(video, target_size):
+    """
+    The MP4 rendition of a Pexels video closest to `target_size`:
+    the smallest one at least as tall, otherwise the tallest there is
+    """
+    files = [
+        f for f in video.get('video_files', [])
+        if f.get('file_type') == 'video/mp4' and f.get('height') and f.get('link')
+    ]
+    if not files:
+        return None
+    large_enough = [f for f in files if f['height'] >= target_size[1]]
+    if large_enough:
+        return min(large_enough, key=lambda f: f['height'])
+    return max(files, key=lambda f: f['height'])
+
+
+def video_media(scene, path, video):
+    return {
+        'scene_number': scene.get('scene_number'),
+        'path': path,
+        'type': 'video',
+        'duration': video.get('duration')
+    }
+
+
+def fetch_cached_scene_video(idx, scene, temp_folder, cache, target_size):
+    """
+    Resolve a scene's clip entirely from the media cache
+    Returns (media, search_data); media is None unless a clip was cached
+    """
+    search_query = build_search_query(scene)
+    data = cache.get_search(PEXELS_VIDEO_SEARCH_URL, search_query, VIDEO_SEARCH_PARAMS)
+
+    for video in (data or {}).get('videos', [])[:3]:
+        video_file = pick_video_file(video, target_size)
+        cached_path = cache.get_asset(video_file['link']) if video_file else None
+        if cached_path:
+            filename = f'{temp_folder}/scene_{idx}_video.mp4'
+            place_file(cached_path, filename)
+            print(f"Scene {idx}: Using cached clip for '{search_query}'")
+            return video_media(scene, filename, video), data
+
+    return None, data
+
+
+def fetch_scene_video(idx, scene, headers, temp_folder, target_size, cache=None, search_data=None):
+    """
+    Search and download a clip for one scene, picking the rendition
+    closest to `target_size`, the output size
+    Returns None when no clip could be downloaded
+    search_data: cached search results, used instead of a new search
+    """
+    search_query = build_search_query(scene)
+    print(f"Scene {idx}: Searching for '{search_query}' (video)")
+    filename = f'{temp_folder}/scene_{idx}_video.mp4'
+
+    try:
+        data = search_data
+        if data is None:
+            params = {'query': search_query, **VIDEO_SEARCH_PARAMS}
+            response = pexels_search(PEXELS_VIDEO_SEARCH_URL, headers, params)
+            if response.status_code != 200:
+                print(f"  Scene {idx}: Video API returned status {response.status_code}")
+                return None
+            data = response.json()
+            if cache:
+                cache.put_search(PEXELS_VIDEO_SEARCH_URL, search_query, VIDEO_SEARCH_PARAMS, data)
+
+        for attempt, video in enumerate(data.get('videos', [])[:3]):
+            video_file = pick_video_file(video, target_size)
+            if not video_file:
+                continue
+            try:
+                print(f"  Scene {idx}: Downloading {video_file['width']}x{video_file['height']} clip "
+                      f"(attempt {attempt + 1})...")
+                # Assets were already looked up when the search came from the cache
+                cached_path = cache.get_asset(video_file['link']) if cache and search_data is None else None
+                if cached_path:
+                    place_file(cached_path, filename)
+                else:
+                    download_file(video_file['link'], filename)
+
+                if os.path.exists(filename) and os.path.getsize(filename) > 0:
+                    if cache and not cached_path:
+                        cache.put_asset(video_file['link'], filename)
+                    return video_media(scene, filename, video)
+            except Exception as download_error:
+                print(f"  Scene {idx}: Clip download attempt {attempt + 1} failed: {download_error}")
+
+        print(f"  Scene {idx}: No clip could be downloaded")
+    except Exception as e:
+        print(f"  Scene {idx}: Video search error: {str(e)}")
+    return None
+
+
+def fallback_media(idx, scene, temp_folder):
+    fallback_path = create_fallback_image(
+        scene.get('visual_description', f'Scene {idx + 1}'),
+        idx,
+        temp_folder
+    )
+    return {
+        'scene_number': scene.get('scene_number'),
+        'path': fallback_path,
+        'type': 'image'
+    }
 
 
-def create_all_fallbacks(scenes):
+def create_all_fallbacks(scenes, workspace=None):
     """
     Create fallback images for all scenes when API is unavailable
     """
     media_files = []
-    temp_folder = 'temp'
+    temp_folder = workspace.path if workspace else 'temp'
     os.makedirs(temp_folder, exist_ok=True)
     
     for idx, scene in enumerate(scenes):
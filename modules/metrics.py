@@ -0,0 +1,330 @@
+import contextvars
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; peak RSS is then reported as unknown
+    resource = None
+
+# Histogram buckets in seconds, from a cache hit to a long 1080p render
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values)) + (extra or [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class Metric:
+    """
+    Base of the Prometheus-style metrics below; values are kept per label set
+    """
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}']
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for n, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['counts'][n] += 1
+                    break
+            state['sum'] += value
+            state['count'] += 1
+
+    def _render_value(self, key, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, state['counts']):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f'{self.name}_sum{labels} {_format_value(state["sum"])}')
+        lines.append(f'{self.name}_count{labels} {state["count"]}')
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    'videogen_stage_seconds', 'Wall time of each pipeline stage', ['stage'])
+STAGE_CPU_SECONDS = Counter(
+    'videogen_stage_cpu_seconds_total', 'Process and child CPU time spent during each stage', ['stage'])
+EXTERNAL_CALL_SECONDS = Histogram(
+    'videogen_external_call_seconds', 'Latency of calls to external services', ['service', 'outcome'])
+SCENE_RENDER_SECONDS = Histogram(
+    'videogen_scene_render_seconds', 'Wall time to render and encode one scene', ['mode'])
+JOBS_TOTAL = Counter(
+    'videogen_jobs_total', 'Finished generation jobs', ['status'])
+PREWARM_JOBS_TOTAL = Counter(
+    'videogen_prewarm_jobs_total', 'Speculative jobs for trending articles by outcome, and clicks that used one', ['status'])
+JOBS_COALESCED = Counter(
+    'videogen_jobs_coalesced_total', 'Requests served by an identical queued, running or completed job', ['status'])
+PEAK_RSS_BYTES = Gauge(
+    'videogen_peak_rss_bytes', 'Peak resident memory of this process and of its reaped children', ['process'])
+
+
+def render_metrics():
+    """
+    Every registered metric in the Prometheus text exposition format
+    """
+    self_rss, children_rss = peak_rss_bytes(), peak_rss_bytes(children=True)
+    if self_rss is not None:
+        PEAK_RSS_BYTES.set(self_rss, process='self')
+        PEAK_RSS_BYTES.set(children_rss, process='children')
+
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def cpu_seconds():
+    """
+    CPU time used so far by this process and its finished children (ffmpeg)
+    """
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def peak_rss_bytes(children=False):
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+
+
+class MemorySampler:
+    """
+    Peak resident memory of this process plus every descendant (ffmpeg and
+    render workers), sampled from /proc while the block runs. Elsewhere only
+    this process's lifetime peak is available, see `sampled`.
+    """
+
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+    @property
+    def sampled(self):
+        return self._thread is not None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.stop()
+        return False
+
+    def start(self):
+        if os.path.exists('/proc/self/statm'):
+            self.peak = self._tree_rss(os.getpid())
+            self._thread = threading.Thread(target=self._run, name='memory-sampler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+        else:
+            self.peak = peak_rss_bytes() or 0
+        return self.peak
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self._tree_rss(os.getpid()))
+        self.peak = max(self.peak, self._tree_rss(os.getpid()))
+
+    def _tree_rss(self, pid):
+        try:
+            with open(f'/proc/{pid}/statm') as f:
+                total = int(f.read().split()[1]) * self._page_size
+            for tid in os.listdir(f'/proc/{pid}/task'):
+                with open(f'/proc/{pid}/task/{tid}/children') as f:
+                    for child in f.read().split():
+                        total += self._tree_rss(int(child))
+            return total
+        except (OSError, ValueError):
+            # The process exited while it was being read
+            return 0
+
+
+class Trace:
+    """
+    Timing breakdown of one job: its stages, external calls and scene renders
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.calls = {}
+        self.scenes = {}
+        self._lock = threading.Lock()
+
+    def record_stage(self, stage, wall, cpu, peak_rss=None):
+        with self._lock:
+            self.stages[stage] = {
+                'wall_seconds': round(wall, 3),
+                'cpu_seconds': round(cpu, 3),
+                'peak_rss_mb': round(peak_rss / (1024 * 1024), 1) if peak_rss is not None else None
+            }
+
+    def record_call(self, service, seconds):
+        with self._lock:
+            calls = self.calls.setdefault(service, {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            calls['calls'] += 1
+            calls['seconds'] += seconds
+            calls['max_seconds'] = max(calls['max_seconds'], seconds)
+
+    def record_scene(self, idx, seconds, cached=False):
+        with self._lock:
+            self.scenes[idx] = {'seconds': round(seconds, 3), 'cached': cached}
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'stages': dict(self.stages),
+                'external_calls': {
+                    service: {
+                        'calls': calls['calls'],
+                        'seconds': round(calls['seconds'], 3),
+                        'max_seconds': round(calls['max_seconds'], 3)
+                    }
+                    for service, calls in self.calls.items()
+                },
+                'scenes': [dict(self.scenes[idx], scene=idx) for idx in sorted(self.scenes)]
+            }
+
+
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def tracing(trace):
+    """
+    Make `trace` the current job's trace for the calls made inside the block
+    """
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def bind(fn):
+    """
+    Wrap `fn` so it records into the caller's trace when run on another thread
+    """
+    trace = _current_trace.get()
+
+    def run(*args, **kwargs):
+        with tracing(trace):
+            return fn(*args, **kwargs)
+    return run
+
+
+@contextmanager
+def external_call(service):
+    """
+    Time a call to an external service into the latency histogram and the job trace
+    """
+    started = time.perf_counter()
+    outcome = 'ok'
+    try:
+        yield
+    except Exception:
+        outcome = 'error'
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        EXTERNAL_CALL_SECONDS.observe(elapsed, service=service, outcome=outcome)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.record_call(service, elapsed)
+
+
+def record_scene_render(idx, seconds, mode, cached=False):
+    if not cached:
+        SCENE_RENDER_SECONDS.observe(seconds, mode=mode)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record_scene(idx, seconds, cached)
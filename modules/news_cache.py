@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+# How soon to retry after a failed refresh while serving the last good snapshot
+RETRY_INTERVAL = 30
+
+
+class NewsCache:
+    """
+    In-process snapshot of the trending feed, refreshed in the background.
+
+    Readers always get the current snapshot immediately; once it is older
+    than `ttl` the refresher thread is woken to fetch a new one
+    (stale-while-revalidate). When the fetch fails the last good snapshot
+    keeps being served. With `snapshot_path` set, snapshots are also shared
+    on disk so several processes can reuse one fetch.
+
+    Callbacks registered with `on_refresh(callback)` are called with every
+    snapshot whose articles differ from the last one they saw.
+    """
+
+    def __init__(self, fetch, ttl=300, snapshot_path=None):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self.last_error = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._listeners = []
+        self._notified_etag = None
+
+    def get(self):
+        """
+        Return the current snapshot: {'articles', 'etag', 'fetched_at'}
+        Only the very first call (with nothing on disk) waits for NewsAPI
+        """
+        self._start()
+        snapshot = self._snapshot
+
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._load_snapshot() or self._fetch_snapshot()
+            snapshot = self._snapshot
+            self._notify(snapshot)
+
+        if self.age(snapshot) >= self.ttl:
+            self._wake.set()
+        return snapshot
+
+    def on_refresh(self, callback):
+        """
+        Call `callback(snapshot)` whenever the trending articles change
+        """
+        self._listeners.append(callback)
+        if self._snapshot is not None:
+            callback(self._snapshot)
+
+    def age(self, snapshot=None):
+        snapshot = snapshot or self._snapshot
+        return time.time() - snapshot['fetched_at'] if snapshot else float('inf')
+
+    def refresh(self):
+        """
+        Replace the snapshot, keeping the old one if NewsAPI fails
+        """
+        shared = self._load_snapshot()
+        if shared and self.age(shared) < self.ttl and self.age(shared) < self.age():
+            # Another process already refreshed the shared snapshot
+            self._snapshot = shared
+            self._notify(shared)
+            return True
+
+        try:
+            self._snapshot = self._fetch_snapshot()
+            self.last_error = None
+            self._notify(self._snapshot)
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Warning: Trending news refresh failed, serving last snapshot: {str(e)}")
+            return False
+
+    def _notify(self, snapshot):
+        with self._lock:
+            if snapshot['etag'] == self._notified_etag:
+                return
+            self._notified_etag = snapshot['etag']
+        for callback in list(self._listeners):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print(f"Warning: News refresh listener failed: {str(e)}")
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._refresh_loop, name='news-refresh', daemon=True)
+                self._thread.start()
+
+    def _refresh_loop(self):
+        while True:
+            delay = self.ttl - self.age() if self._snapshot else self.ttl
+            if self.last_error:
+                delay = min(delay, RETRY_INTERVAL)
+            self._wake.wait(timeout=max(1, delay))
+            self._wake.clear()
+            if self._snapshot is None or self.age() >= self.ttl:
+                self.refresh()
+
+    def _fetch_snapshot(self):
+        articles = self.fetch()
+        body = json.dumps(articles, sort_keys=True).encode('utf-8')
+        snapshot = {
+            'articles': articles,
+            'etag': hashlib.sha1(body).hexdigest(),
+            'fetched_at': time.time(),
+        }
+        self._save_snapshot(snapshot)
+        return snapshot
+
+    def _load_snapshot(self):
+        if not self.snapshot_path:
+            return None
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_snapshot(self, snapshot):
+        if not self.snapshot_path:
+            return
+        directory = os.path.dirname(self.snapshot_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        partial = f'{self.snapshot_path}.{os.getpid()}.part'
+        try:
+            with open(partial, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(partial, self.snapshot_path)
+        except OSError as e:
+            print(f"Warning: Failed to write news snapshot {self.snapshot_path}: {e}")
@@ -1,5 +1,7 @@
 import requests
 import os
+from modules.clients import get_session
+from modules.metrics import external_call
 from datetime import datetime, timedelta
 
 def fetch_trending_news(limit=10):
@@ -14,7 +16,7 @@ def fetch_trending_news(limit=10):
     # Get news from last 24 hours
     from_date = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
     
-    url = 'https://newsapi.org/v2/top-headlines'
+    url = f"{os.getenv('NEWSAPI_BASE_URL', 'https://newsapi.org').rstrip('/')}/v2/top-headlines"
     params = {
         'apiKey': api_key,
         'language': 'en',
@@ -24,7 +26,8 @@ def fetch_trending_news(limit=10):
     }
     
     try:
-        response = requests.get(url, params=params)
+        with external_call('newsapi'):
+            response = get_session('newsapi').get(url, params=params)
         response.raise_for_status()
         data = response.json()
         
@@ -0,0 +1,227 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from modules.script_generator import generate_script
+from modules.scene_analyzer import analyze_scenes
+from modules.media_fetcher import MediaFetcher
+from modules.video_assembler import create_video
+from modules.tts import audio_duration, synthesize_narration
+from modules.admission import get_admission_controller
+from modules.render_profiles import get_profile
+from modules.workspace import Workspace
+from modules.metrics import bind
+from modules.preview import PREVIEW_TTL, PROXY_PROFILE, create_storyboard
+
+
+def run_pipeline(job, output_folder, temp_folder='temp'):
+    """
+    Run the full generation pipeline for a queued job
+    Returns the fields merged into the job status once it completes
+
+    A job with 'preview' in its payload stops at a cheap proxy video or a
+    storyboard and keeps its inputs; a job with 'promote' renders the full
+    video from such a preview's inputs.
+    """
+    if job.payload.get('promote'):
+        return _promote(job, output_folder, temp_folder, job.payload['promote'])
+
+    preview = job.payload.get('preview')
+    if preview:
+        # Previews that were never promoted are removed once they expire
+        Workspace.sweep(temp_folder)
+
+    # Every job gets its own scratch folder so concurrent renders never
+    # overwrite each other's downloads, voiceover or audio files
+    with Workspace(temp_folder, job.id) as workspace:
+        inputs = _prepare_inputs(job, workspace)
+        if not preview:
+            return render_inputs(job, output_folder, workspace, inputs)
+
+        result = _render_preview(job, output_folder, workspace, inputs, preview)
+        expires_at = time.time() + PREVIEW_TTL
+        workspace.keep_until(expires_at)
+        job.artifacts = dict(inputs, workspace=workspace.path, expires_at=expires_at)
+        return result
+
+
+def _prepare_inputs(job, workspace):
+    """
+    Dataflow execution of the pipeline stages:
+    the voiceover starts as soon as the script exists, each scene's media
+    fetch starts as soon as that scene is analyzed, and rendering starts
+    once the audio and every scene's media are ready
+
+    Returns everything a render needs: script, scenes, media_files,
+    audio_path and scene_durations
+    """
+    article = job.payload['article']
+    deterministic = job.payload.get('deterministic')
+
+    # Step 1: Generate script using GROQ
+    print(f"[{job.id}] Generating script...")
+    job.start_stage('script')
+    script = generate_script(article, deterministic=deterministic)
+    job.finish_stage('script')
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='voiceover') as tts_executor:
+        # The voiceover only needs each scene's narration, so it overlaps
+        # with scene analysis and media fetching
+        print(f"[{job.id}] Generating voiceover...")
+        audio_path = workspace.file('voiceover.mp3')
+        voiceover = tts_executor.submit(
+            bind(synthesize_narration),
+            script,
+            script.get('scenes', []),
+            audio_path,
+            workspace.path
+        )
+        voiceover.add_done_callback(
+            lambda future: job.emit('voiceover_ready') if future.exception() is None else None
+        )
+
+        # Steps 2 and 3: Analyze scenes using Gemini, streaming each analyzed
+        # scene straight into the Pexels media fetcher
+        print(f"[{job.id}] Analyzing scenes and fetching media...")
+        job.start_stage('scenes')
+        job.start_stage('media')
+        # Clips are picked for the requested profile; a downgraded render only scales them down
+        with MediaFetcher(
+            workspace,
+            max_workers=len(script.get('scenes', [])),
+            on_progress=job.emit,
+            target_size=get_profile(job.payload.get('profile'))['size']
+        ) as fetcher:
+            media_futures = {}
+
+            def on_scene(idx, scene):
+                job.emit('scene_analyzed', scene=idx, total=len(script.get('scenes', [])))
+                media_futures.setdefault(idx, fetcher.submit(idx, scene))
+
+            scenes = analyze_scenes(script, on_scene=on_scene, deterministic=deterministic)
+            job.finish_stage('scenes')
+
+            media_files = [media_futures[idx].result() for idx in range(len(scenes))]
+        job.finish_stage('media')
+
+        try:
+            scene_durations = voiceover.result()
+        except Exception as e:
+            raise Exception(f"Failed to generate voiceover: {str(e)}")
+
+    return {
+        'script': script,
+        'scenes': scenes,
+        'media_files': media_files,
+        'audio_path': audio_path,
+        'scene_durations': scene_durations
+    }
+
+
+def render_inputs(job, output_folder, workspace, inputs):
+    """
+    Render the full video from prepared inputs, with the job's profile
+    """
+    script = inputs['script']
+    scenes = inputs['scenes']
+    audio_path = inputs['audio_path']
+    scene_durations = inputs['scene_durations']
+
+    # Step 4: Create video
+    print(f"[{job.id}] Creating video...")
+    job.start_stage('render')
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    output_filename = f'video_{timestamp}_{job.id[:8]}.mp4'
+    output_path = os.path.join(output_folder, output_filename)
+
+    # Reserve memory and cores for the render; a busy host queues the
+    # render or downgrades it to a cheaper profile
+    duration = sum(scene_durations) if scene_durations else audio_duration(audio_path)
+    with get_admission_controller().reserve(
+        job.payload.get('profile'),
+        len(scenes),
+        duration,
+        allow_downgrade=job.payload.get('allow_downgrade'),
+        on_wait=lambda estimate: job.emit('render_waiting', **estimate)
+    ) as profile:
+        job.emit(
+            'render_admitted',
+            profile=profile['name'],
+            requested_profile=profile['requested'],
+            **profile['estimate']
+        )
+        create_video(
+            script, scenes, inputs['media_files'], output_path, workspace,
+            audio_path=audio_path, scene_durations=scene_durations, on_progress=job.emit,
+            profile=profile
+        )
+
+    if not os.path.exists(output_path):
+        raise Exception("Video rendering failed, no output file was written")
+    job.finish_stage('render')
+
+    return {
+        'video_url': f'/outputs/{output_filename}',
+        'script': script,
+        'scenes': scenes,
+        'profile': profile['name'],
+        'requested_profile': profile['requested']
+    }
+
+
+def _render_preview(job, output_folder, workspace, inputs, kind):
+    """
+    Render a low-res still-frame proxy video or a storyboard image
+    """
+    print(f"[{job.id}] Creating {kind} preview...")
+    job.start_stage('render')
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+    if kind == 'storyboard':
+        output_filename = f'storyboard_{timestamp}_{job.id[:8]}.jpg'
+        output_path = os.path.join(output_folder, output_filename)
+        create_storyboard(inputs['scenes'], inputs['media_files'], output_path)
+    else:
+        output_filename = f'preview_{timestamp}_{job.id[:8]}.mp4'
+        output_path = os.path.join(output_folder, output_filename)
+        duration = sum(inputs['scene_durations']) if inputs['scene_durations'] else audio_duration(inputs['audio_path'])
+        # The proxy is cheaper than the draft profile, so that reservation covers it
+        with get_admission_controller().reserve('draft', len(inputs['scenes']), duration, allow_downgrade=False):
+            create_video(
+                inputs['script'], inputs['scenes'], inputs['media_files'], output_path, workspace,
+                audio_path=inputs['audio_path'], scene_durations=inputs['scene_durations'],
+                on_progress=job.emit, profile=PROXY_PROFILE, static=True
+            )
+
+    if not os.path.exists(output_path):
+        raise Exception("Preview rendering failed, no output file was written")
+    job.finish_stage('render')
+
+    return {
+        'preview': kind,
+        'preview_url': f'/outputs/{output_filename}',
+        'promote_url': f'/api/jobs/{job.id}/promote',
+        'script': inputs['script'],
+        'scenes': inputs['scenes']
+    }
+
+
+def _promote(job, output_folder, temp_folder, artifacts):
+    """
+    Full render of an approved preview, reusing its script, media and voiceover
+    """
+    if not os.path.isdir(artifacts['workspace']):
+        raise Exception("The preview's inputs have expired, generate the video again")
+
+    # Keep the preview's inputs around while they are being rendered
+    source = Workspace(os.path.dirname(artifacts['workspace']), os.path.basename(artifacts['workspace']))
+    artifacts['expires_at'] = time.time() + PREVIEW_TTL
+    source.keep_until(artifacts['expires_at'])
+
+    for stage in ('script', 'scenes', 'media'):
+        job.skip_stage(stage)
+
+    # Intermediate files go to this job's own workspace, so several
+    # promotions of the same preview never collide
+    with Workspace(temp_folder, job.id) as workspace:
+        return render_inputs(job, output_folder, workspace, artifacts)
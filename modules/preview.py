@@ -0,0 +1,84 @@
+import os
+from moviepy.editor import VideoFileClip
+from PIL import Image, ImageDraw, ImageOps
+from modules.fonts import font_lock, get_font, text_width, wrap_text
+
+PREVIEW_KINDS = ('video', 'storyboard')
+# Low-res proxy: still frames per scene at a few fps, encoded as fast as possible
+PROXY_PROFILE = {'name': 'proxy', 'size': (640, 360), 'fps': 6, 'preset': 'ultrafast', 'crf': 32}
+# How long a preview's inputs are kept for promotion to a full render
+PREVIEW_TTL = int(os.getenv('PREVIEW_TTL', 3600))
+
+THUMB_SIZE = (400, 225)
+STORYBOARD_COLUMNS = 3
+STORYBOARD_MARGIN = 20
+CAPTION_FONT_SIZE = 16
+CAPTION_LINES = 3
+BACKGROUND = (30, 30, 50)
+
+
+def media_thumbnail(media):
+    """
+    A THUMB_SIZE image of a scene's media: the image itself or a frame
+    one second into the clip (its middle when shorter); None when unreadable
+    """
+    if not media or not os.path.exists(media['path']):
+        return None
+    try:
+        if media['type'] == 'video':
+            clip = VideoFileClip(media['path'], audio=False)
+            try:
+                image = Image.fromarray(clip.get_frame(min(1.0, clip.duration / 2)))
+            finally:
+                clip.close()
+        else:
+            with Image.open(media['path']) as source:
+                image = source.convert('RGB')
+        return ImageOps.fit(image.convert('RGB'), THUMB_SIZE, Image.Resampling.BILINEAR)
+    except Exception as e:
+        print(f"Warning: No storyboard thumbnail for {media['path']}: {str(e)}")
+        return None
+
+
+def create_storyboard(scenes, media_files, output_path):
+    """
+    Contact sheet of every scene's image with its number and narration
+    """
+    columns = max(1, min(STORYBOARD_COLUMNS, len(scenes)))
+    rows = max(1, -(-len(scenes) // columns))
+    thumb_width, thumb_height = THUMB_SIZE
+    line_height = int(CAPTION_FONT_SIZE * 1.3)
+    cell_height = thumb_height + line_height * (CAPTION_LINES + 1) + STORYBOARD_MARGIN
+
+    sheet = Image.new(
+        'RGB',
+        (columns * (thumb_width + STORYBOARD_MARGIN) + STORYBOARD_MARGIN, rows * cell_height + STORYBOARD_MARGIN),
+        BACKGROUND
+    )
+    draw = ImageDraw.Draw(sheet)
+    font = get_font(CAPTION_FONT_SIZE)
+    media_by_scene = {media['scene_number']: media for media in media_files}
+
+    for idx, scene in enumerate(scenes):
+        x = STORYBOARD_MARGIN + (idx % columns) * (thumb_width + STORYBOARD_MARGIN)
+        y = STORYBOARD_MARGIN + (idx // columns) * cell_height
+
+        thumb = media_thumbnail(media_by_scene.get(scene.get('scene_number')))
+        if thumb:
+            sheet.paste(thumb, (x, y))
+        else:
+            draw.rectangle((x, y, x + thumb_width - 1, y + thumb_height - 1), outline=(90, 90, 120), width=2)
+
+        lines = [f"Scene {idx + 1}"] + wrap_text(' '.join(scene.get('narration', '').split()), CAPTION_FONT_SIZE, thumb_width)
+        if len(lines) > CAPTION_LINES + 1:
+            lines = lines[:CAPTION_LINES + 1]
+            while lines[-1] and text_width(lines[-1] + '...', CAPTION_FONT_SIZE) > thumb_width:
+                lines[-1] = lines[-1][:-1]
+            lines[-1] += '...'
+        with font_lock:
+            for n, line in enumerate(lines):
+                fill = (102, 126, 234) if n == 0 else (230, 230, 230)
+                draw.text((x, y + thumb_height + 5 + n * line_height), line, font=font, fill=fill)
+
+    sheet.save(output_path, format='JPEG', quality=85)
+    return output_path
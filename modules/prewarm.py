@@ -0,0 +1,179 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from modules.coalescing import article_identity, job_key
+from modules.job_queue import QueueFullError
+from modules.metrics import PREWARM_JOBS_TOTAL
+from modules.preview import PREVIEW_TTL
+
+PREWARM_MODES = ('storyboard', 'video', 'render')
+# How often a blocked scheduler checks again whether it may start a job
+POLL_INTERVAL = 5
+BUDGET_WINDOW = 3600
+
+
+def load_per_core():
+    """
+    One-minute load average divided by the core count, 0 where it is unavailable
+    """
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return 0.0
+
+
+class Prewarmer:
+    """
+    Generates the top trending articles before anyone clicks them.
+
+    Every feed refresh replaces the queue with the top `top_k` articles,
+    best-ranked first. One warm job runs at a time and only while no user
+    job is waiting, a render worker is free, the load average per core is
+    below `max_load` and fewer than `budget` warm jobs started in the last hour.
+
+    mode: 'storyboard' or 'video' prepare the script, scene analysis, media
+    and voiceover behind a cheap preview, and a click on the article promotes
+    the full render from them; 'render' renders the whole video with
+    `profile`, so a matching click gets the finished video.
+    """
+
+    def __init__(self, job_queue, top_k=3, mode='storyboard', profile=None, budget=10, max_load=0.75,
+                 result_ttl=3600):
+        if mode not in PREWARM_MODES:
+            raise Exception(f"Unknown prewarm mode '{mode}', expected one of {', '.join(PREWARM_MODES)}")
+        self.job_queue = job_queue
+        self.top_k = top_k
+        self.mode = mode
+        self.profile = profile
+        self.budget = budget
+        self.max_load = max_load
+        self.result_ttl = result_ttl
+        self._heap = []
+        self._order = itertools.count()
+        self._started = deque()
+        self._current = None
+        # article identity -> warm job
+        self._warm = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def on_refresh(self, snapshot):
+        """
+        NewsCache listener: queue the new top articles in place of the old ones
+        """
+        with self._lock:
+            self._heap = []
+            for rank, article in enumerate(snapshot['articles'][:self.top_k]):
+                heapq.heappush(self._heap, (rank, next(self._order), article))
+            # Forget warm jobs whose results can no longer be reused
+            now = datetime.now()
+            for identity, job in list(self._warm.items()):
+                if job.status == 'failed' or (
+                    job.finished_at and (now - job.finished_at).total_seconds() > job.result_ttl
+                ):
+                    del self._warm[identity]
+        self._start()
+        self._wake.set()
+
+    def warmed(self, article):
+        """
+        The completed warm preview of `article` whose inputs can still be promoted, or None
+        """
+        with self._lock:
+            job = self._warm.get(article_identity(article))
+        if job is None or job.status != 'completed' or not job.artifacts:
+            return None
+        if job.artifacts['expires_at'] < time.time() or not os.path.isdir(job.artifacts['workspace']):
+            return None
+        return job
+
+    def stats(self):
+        with self._lock:
+            self._expire_budget()
+            return {
+                'mode': self.mode,
+                'pending': len(self._heap),
+                'warming': self._current.id if self._busy_warming() else None,
+                'started_last_hour': len(self._started),
+                'budget': self.budget,
+                'load_per_core': round(load_per_core(), 2),
+            }
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='prewarm', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(timeout=POLL_INTERVAL)
+            self._wake.clear()
+            try:
+                while self._may_start():
+                    with self._lock:
+                        if not self._heap:
+                            break
+                        rank, order, article = heapq.heappop(self._heap)
+                    if not self._submit(rank, article):
+                        break
+            except Exception as e:
+                print(f"Warning: Prewarm scheduler error: {str(e)}")
+
+    def _may_start(self):
+        with self._lock:
+            if self._busy_warming():
+                return False
+            if self._current is not None:
+                PREWARM_JOBS_TOTAL.inc(status=self._current.status)
+                self._current = None
+            self._expire_budget()
+            if len(self._started) >= self.budget:
+                return False
+
+        stats = self.job_queue.stats()
+        if stats['queued'] or stats['running'] >= stats['workers']:
+            return False
+        return load_per_core() < self.max_load
+
+    def _busy_warming(self):
+        return self._current is not None and self._current.status in ('queued', 'running')
+
+    def _expire_budget(self):
+        while self._started and time.time() - self._started[0] > BUDGET_WINDOW:
+            self._started.popleft()
+
+    def _submit(self, rank, article):
+        # Queue a warm job for `article`; False when the queue refused it
+        preview = None if self.mode == 'render' else self.mode
+        payload = {
+            'article': article,
+            'deterministic': None,
+            'profile': self.profile,
+            'allow_downgrade': None,
+            'preview': preview,
+            'prewarm': True
+        }
+        try:
+            job, coalesced = self.job_queue.submit_once(
+                payload, job_key(payload), result_ttl=PREVIEW_TTL if preview else self.result_ttl
+            )
+        except QueueFullError:
+            with self._lock:
+                heapq.heappush(self._heap, (rank, next(self._order), article))
+            return False
+
+        with self._lock:
+            self._warm[article_identity(article)] = job
+            if not coalesced:
+                # A coalesced article was already generated or is being generated, so it costs nothing
+                print(f"Prewarming #{rank + 1}: {article.get('title')}")
+                self._started.append(time.time())
+                self._current = job
+                PREWARM_JOBS_TOTAL.inc(status='submitted')
+        return True
@@ -0,0 +1,109 @@
+import queue
+import threading
+import time
+
+# Events after which a job publishes nothing more
+TERMINAL_EVENTS = ('job_completed', 'job_failed')
+# Render progress is published at most this often
+RENDER_PROGRESS_INTERVAL = 0.5
+
+
+class ProgressBus:
+    """
+    Per-job fan-out of structured progress events.
+
+    Pipeline stages publish events; every subscriber gets its own queue and
+    subscribers that join late first replay what the job has published so far.
+    """
+
+    def __init__(self, history=1000):
+        self.history = history
+        self._events = {}
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, job_id, event_type, **data):
+        event = {'type': event_type, 'job_id': job_id, 'time': time.time(), **data}
+        with self._lock:
+            events = self._events.setdefault(job_id, [])
+            events.append(event)
+            if len(events) > self.history:
+                # Keep the first events (queued/started) and the most recent ones
+                del events[10:len(events) - self.history + 10]
+            for subscriber in self._subscribers.get(job_id, []):
+                subscriber.put(event)
+        return event
+
+    def subscribe(self, job_id, keepalive=15):
+        """
+        Yield the job's events, replaying history first, until the job ends
+        Yields None every `keepalive` seconds without events
+        """
+        subscriber = queue.Queue()
+        with self._lock:
+            backlog = list(self._events.get(job_id, []))
+            self._subscribers.setdefault(job_id, []).append(subscriber)
+
+        try:
+            for event in backlog:
+                yield event
+                if event['type'] in TERMINAL_EVENTS:
+                    return
+            while True:
+                try:
+                    event = subscriber.get(timeout=keepalive)
+                except queue.Empty:
+                    yield None
+                    continue
+                yield event
+                if event['type'] in TERMINAL_EVENTS:
+                    return
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(job_id, [])
+                if subscriber in subscribers:
+                    subscribers.remove(subscriber)
+                if not subscribers:
+                    self._subscribers.pop(job_id, None)
+
+    def events(self, job_id):
+        with self._lock:
+            return list(self._events.get(job_id, []))
+
+    def forget(self, job_id):
+        with self._lock:
+            self._events.pop(job_id, None)
+
+
+class RenderProgress:
+    """
+    Turns encoded frame counts into throttled render_progress events with an ETA
+    """
+
+    def __init__(self, total_frames, on_progress=None):
+        self.total_frames = max(1, total_frames)
+        self.on_progress = on_progress
+        self.frames = 0
+        self.started = time.monotonic()
+        self._last_emit = 0
+        self._lock = threading.Lock()
+
+    def advance(self, frames=1):
+        with self._lock:
+            self.frames = min(self.total_frames, self.frames + frames)
+            now = time.monotonic()
+            done = self.frames >= self.total_frames
+            if self.on_progress is None or (not done and now - self._last_emit < RENDER_PROGRESS_INTERVAL):
+                return
+            self._last_emit = now
+
+            elapsed = now - self.started
+            rate = self.frames / elapsed if elapsed > 0 else 0
+            eta = (self.total_frames - self.frames) / rate if rate > 0 else None
+            self.on_progress(
+                'render_progress',
+                frames=self.frames,
+                total_frames=self.total_frames,
+                fps=round(rate, 1),
+                eta=round(eta, 1) if eta is not None else None
+            )
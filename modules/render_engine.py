@@ -0,0 +1,140 @@
+import math
+import numpy as np
+from PIL import Image
+from moviepy.editor import VideoFileClip
+from modules.captions import caption_layer
+
+# Ken Burns zoom reached at the end of each image scene
+KEN_BURNS_ZOOM = 0.02
+
+
+def scene_frame_count(spec, fps):
+    return max(1, int(round(spec['duration'] * fps)))
+
+
+class SceneRenderer:
+    """
+    Produces the frames of one scene with plain NumPy/Pillow operations.
+
+    Images are scaled once to the largest size the zoom ever needs; each
+    frame is then a NumPy crop of the visible window plus one affine
+    resample, and the caption is blended with an alpha mask computed once.
+    """
+
+    def __init__(self, spec, size, fps):
+        self.size = size
+        self.fps = fps
+        self.duration = spec['duration']
+        self.zoom = spec.get('zoom', 0) if spec['type'] == 'image' else 0
+        self.video = None
+        self.source = None
+
+        width, height = size
+        if spec['type'] == 'video':
+            self.video = VideoFileClip(spec['path'], audio=False)
+        else:
+            with Image.open(spec['path']) as image:
+                image = image.convert('RGB')
+                # Fit the height at the strongest zoom so frames only ever downsample
+                scaled_height = round(height * (1 + self.zoom))
+                scaled_width = max(1, round(image.width * scaled_height / image.height))
+                self.source = np.array(image.resize((scaled_width, scaled_height), Image.Resampling.LANCZOS))
+
+        self._caption = None
+        caption = caption_layer(spec['caption'], size) if spec.get('caption') else None
+        if caption:
+            self._prepare_caption(*caption)
+
+    @property
+    def frame_count(self):
+        return scene_frame_count({'duration': self.duration}, self.fps)
+
+    def frames(self):
+        """
+        Yield every frame of the scene in order
+        """
+        if self.video is None and not self.zoom:
+            # A still image without zoom is the same frame throughout
+            frame = self.frame_at(0)
+            for n in range(self.frame_count):
+                yield frame
+            return
+        for n in range(self.frame_count):
+            yield self.frame_at(n / self.fps)
+
+    def frame_at(self, t):
+        if self.video is not None:
+            frame = self._video_frame(t)
+        else:
+            zoom = 1 + self.zoom * t / self.duration if self.duration else 1
+            frame = self._resample(self.source, zoom / (1 + self.zoom))
+
+        if self._caption is not None:
+            (y0, y1, x0, x1), premultiplied, inverse_alpha = self._caption
+            region = frame[y0:y1, x0:x1].astype(np.float32)
+            frame[y0:y1, x0:x1] = (region * inverse_alpha + premultiplied).astype(np.uint8)
+
+        return frame
+
+    def close(self):
+        if self.video is not None:
+            self.video.close()
+            self.video = None
+
+    def _video_frame(self, t):
+        # Loop clips shorter than the scene, trim longer ones
+        clip_duration = self.video.duration
+        if clip_duration < self.duration:
+            t = t % clip_duration
+        t = min(t, max(0, clip_duration - 1.0 / self.fps))
+        source = self.video.get_frame(t)
+        if source.shape[:2] == (self.size[1], self.size[0]):
+            # Proxies are already at the output size; only the caption is drawn on top
+            return source.copy()
+        return self._resample(source, self.size[1] / source.shape[0])
+
+    def _resample(self, source, scale):
+        """
+        Scale `source` by `scale` about its center into an output-sized frame,
+        leaving black bars where the source does not cover the frame
+        """
+        width, height = self.size
+        source_height, source_width = source.shape[:2]
+        half_w = width / (2 * scale)
+        half_h = height / (2 * scale)
+
+        # Only the window that ends up on screen is handed to Pillow
+        x0 = max(0, int(math.floor(source_width / 2 - half_w)))
+        x1 = min(source_width, int(math.ceil(source_width / 2 + half_w)) + 1)
+        y0 = max(0, int(math.floor(source_height / 2 - half_h)))
+        y1 = min(source_height, int(math.ceil(source_height / 2 + half_h)) + 1)
+        window = Image.fromarray(source[y0:y1, x0:x1])
+
+        inverse = 1.0 / scale
+        coefficients = (
+            inverse, 0, source_width / 2 - half_w - x0,
+            0, inverse, source_height / 2 - half_h - y0
+        )
+        frame = window.transform(
+            (width, height),
+            Image.Transform.AFFINE,
+            coefficients,
+            resample=Image.Resampling.BILINEAR
+        )
+        return np.array(frame)
+
+    def _prepare_caption(self, rgb, alpha, position):
+        width, height = self.size
+        x, y = position
+        caption_height, caption_width = rgb.shape[:2]
+
+        # Clip the caption to the frame
+        cx0, cy0 = max(0, -x), max(0, -y)
+        cx1, cy1 = min(caption_width, width - x), min(caption_height, height - y)
+        if cx1 <= cx0 or cy1 <= cy0:
+            return
+
+        alpha = alpha[cy0:cy1, cx0:cx1].astype(np.float32)[..., None]
+        premultiplied = rgb[cy0:cy1, cx0:cx1, :3].astype(np.float32) * alpha
+        box = (y + cy0, y + cy1, x + cx0, x + cx1)
+        self._caption = (box, premultiplied, 1.0 - alpha)
@@ -0,0 +1,47 @@
+import os
+from modules.encoder import encoder_settings
+
+# Named output settings, cheapest first; 'standard' follows VIDEO_SIZE,
+# VIDEO_PRESET and VIDEO_CRF so existing configuration keeps working
+PROFILE_ORDER = ['draft', 'preview', 'standard', 'hd']
+RENDER_PROFILES = {
+    'draft': {'size': (640, 360), 'fps': 12, 'preset': 'ultrafast', 'crf': 32},
+    'preview': {'size': (854, 480), 'fps': 15, 'preset': 'veryfast', 'crf': 28},
+    'standard': None,
+    'hd': {'size': (1920, 1080), 'fps': 24, 'preset': 'medium', 'crf': 21},
+}
+DEFAULT_FPS = 24
+
+
+def video_size():
+    """
+    Output resolution from VIDEO_SIZE (WIDTHxHEIGHT, default 1280x720)
+    """
+    width, height = os.getenv('VIDEO_SIZE', '1280x720').lower().split('x')
+    return int(width), int(height)
+
+
+def default_profile_name():
+    return os.getenv('RENDER_PROFILE', 'standard')
+
+
+def get_profile(name=None):
+    """
+    Settings of a render profile as a new dict: name, size, fps, preset and crf
+    """
+    name = name or default_profile_name()
+    if name not in RENDER_PROFILES:
+        raise Exception(f"Unknown render profile '{name}', expected one of {', '.join(PROFILE_ORDER)}")
+
+    profile = RENDER_PROFILES[name]
+    if profile is None:
+        settings = encoder_settings()
+        profile = {'size': video_size(), 'fps': DEFAULT_FPS, 'preset': settings['preset'], 'crf': settings['crf']}
+    return dict(profile, name=name)
+
+
+def lower_profiles(name):
+    """
+    Profiles cheaper than `name`, most expensive first
+    """
+    return list(reversed(PROFILE_ORDER[:PROFILE_ORDER.index(name)]))
@@ -1,24 +1,201 @@
 import os
-import google.generativeai as genai
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from modules.clients import get_gemini_model
+from modules.llm_cache import deterministic_default, memoized
+from modules.metrics import bind, external_call
 
-def analyze_scenes(script_data):
+ANALYSIS_MODES = ('sequential', 'concurrent', 'batched')
+# Where the JSON answer sits in a response, which may wrap it in prose or code fences
+JSON_PATTERNS = {dict: r'\{.*\}', list: r'\[.*\]'}
+GEMINI_MODEL = 'gemini-1.5-flash'
+DETERMINISTIC_CONFIG = {'temperature': 0}
+
+
+def analyze_scenes(script_data, mode=None, max_workers=None, timeout=None, on_scene=None, deterministic=None):
     """
     Analyze scenes and generate search keywords using Google Gemini
+
+    mode: 'sequential' (one call per scene, in order), 'concurrent' (one call
+    per scene, all in flight at once) or 'batched' (a single call for every
+    scene). Defaults come from SCENE_ANALYSIS_MODE, SCENE_ANALYSIS_CONCURRENCY
+    and SCENE_ANALYSIS_TIMEOUT.
+
+    on_scene: optional callback(idx, scene) called exactly once per scene as
+    soon as its analysis (or fallback) is ready, possibly from another thread.
+
+    deterministic: sample at temperature 0 and reuse cached responses for
+    identical prompts (defaults to LLM_DETERMINISTIC).
     """
-    api_key = os.getenv('GEMINI_API_KEY')
-    
-    if not api_key:
-        raise Exception("GEMINI_API_KEY not found in environment variables")
-    
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    
+    mode = mode or os.getenv('SCENE_ANALYSIS_MODE', 'concurrent')
+    if mode not in ANALYSIS_MODES:
+        raise Exception(f"Unknown scene analysis mode: {mode}")
+    max_workers = max_workers or int(os.getenv('SCENE_ANALYSIS_CONCURRENCY', 4))
+    timeout = timeout or float(os.getenv('SCENE_ANALYSIS_TIMEOUT', 20))
+
+    if deterministic is None:
+        deterministic = deterministic_default()
+
+    # Shared model instance; the SDK is configured once per process
+    model = get_gemini_model(
+        GEMINI_MODEL,
+        generation_config=DETERMINISTIC_CONFIG if deterministic else None
+    )
+
+    def call_gemini(prompt):
+        with external_call('gemini'):
+            return model.generate_content(prompt).text
+
+    def generate(prompt, expected):
+        if deterministic:
+            # Only responses the parsers below accept are memoized, so a bad one is retried next time
+            return memoized(
+                GEMINI_MODEL, prompt, DETERMINISTIC_CONFIG, lambda: call_gemini(prompt),
+                validate=lambda text: extract_json(text, expected)
+            )
+        return call_gemini(prompt)
+
     scenes = script_data.get('scenes', [])
-    
+    report = _SceneReporter(on_scene)
+
+    if mode == 'batched':
+        enhanced_scenes = _analyze_batched(generate, scenes)
+        for idx, enhanced_scene in enumerate(enhanced_scenes):
+            report(idx, enhanced_scene)
+        return enhanced_scenes
+    if mode == 'concurrent' and len(scenes) > 1:
+        return _analyze_concurrent(generate, scenes, max_workers, timeout, report)
+
+    enhanced_scenes = []
+
+    for idx, scene in enumerate(scenes):
+        try:
+            enhanced_scene = _analyze_scene(generate, scene)
+        except Exception as e:
+            enhanced_scene = _fallback_scene(scene, e)
+        enhanced_scenes.append(enhanced_scene)
+        report(idx, enhanced_scene)
+
+    return enhanced_scenes
+
+
+class _SceneReporter:
+    """
+    Calls on_scene once per scene index, whichever thread gets there first
+    """
+
+    def __init__(self, on_scene):
+        self.on_scene = on_scene
+        self.reported = set()
+        self.lock = threading.Lock()
+
+    def __call__(self, idx, scene):
+        if self.on_scene is None:
+            return
+        # Held while calling back so the scene is handed off before anyone
+        # else sees it as reported
+        with self.lock:
+            if idx in self.reported:
+                return
+            self.reported.add(idx)
+            self.on_scene(idx, scene)
+
+
+def _analyze_concurrent(generate, scenes, max_workers, timeout, report):
+    """
+    Analyze every scene in parallel, keeping results in scene order
+    Each scene is reported as soon as its own call finishes
+    """
+    max_workers = max(1, min(max_workers, len(scenes)))
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scene-analysis')
+    started = time.monotonic()
+    futures = [executor.submit(bind(_analyze_scene), generate, scene) for scene in scenes]
+    for idx, future in enumerate(futures):
+        future.add_done_callback(lambda f, idx=idx: _report_done(f, idx, report))
+
+    enhanced_scenes = []
+    try:
+        for idx, (scene, future) in enumerate(zip(scenes, futures)):
+            # Calls run in waves of max_workers, so scene idx is guaranteed a
+            # slot by the time the waves ahead of it have used their timeout
+            deadline = started + timeout * (idx // max_workers + 1)
+            try:
+                enhanced_scenes.append(future.result(timeout=max(0, deadline - time.monotonic())))
+            except Exception as e:
+                if not future.done():
+                    future.cancel()
+                    e = Exception(f"timed out after {timeout:.0f}s")
+                enhanced_scenes.append(_fallback_scene(scene, e))
+            report(idx, enhanced_scenes[-1])
+    finally:
+        # Do not block on calls that are still hanging after their timeout
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return enhanced_scenes
+
+
+def _report_done(future, idx, report):
+    # Failures and timeouts are reported by the caller once it has the fallback
+    if not future.cancelled() and future.exception() is None:
+        report(idx, future.result())
+
+
+def _analyze_batched(generate, scenes):
+    """
+    Analyze all scenes with a single prompt that returns a JSON array
+    """
+    if not scenes:
+        return []
+
+    scene_blocks = []
+    for idx, scene in enumerate(scenes):
+        scene_blocks.append(f"""Scene {idx + 1}:
+Visual: {scene.get('visual_description', '')}
+Narration: {scene.get('narration', '')}""")
+    scene_list = '\n\n'.join(scene_blocks)
+
+    prompt = f"""
+Based on these video scene descriptions, generate the best search keywords to find relevant stock footage or images for each scene:
+
+{scene_list}
+
+For every scene provide 3-5 specific search keywords that would find the most relevant visuals.
+Also suggest the type of media needed (photo, video, graphic).
+
+Format as a JSON array with exactly {len(scenes)} objects, in scene order:
+[
+    {{
+        "keywords": ["keyword1", "keyword2", "keyword3"],
+        "media_type": "photo or video",
+        "mood": "description of mood/tone"
+    }}
+]
+"""
+
+    try:
+        analyses = extract_json(generate(prompt, list), list)
+    except Exception as e:
+        return [_fallback_scene(scene, e) for scene in scenes]
+
     enhanced_scenes = []
-    
-    for scene in scenes:
-        prompt = f"""
+    for idx, scene in enumerate(scenes):
+        scene_analysis = analyses[idx] if idx < len(analyses) else None
+        if isinstance(scene_analysis, dict):
+            enhanced_scenes.append(_enhance_scene(scene, scene_analysis))
+        else:
+            enhanced_scenes.append(_fallback_scene(scene, Exception("Missing from batched response")))
+
+    return enhanced_scenes
+
+
+def _analyze_scene(generate, scene):
+    """
+    Ask Gemini for search keywords for a single scene
+    """
+    prompt = f"""
 Based on this video scene description, generate the best search keywords to find relevant stock footage or images:
 
 Scene: {scene.get('visual_description', '')}
@@ -34,44 +211,53 @@ Format as JSON:
     "mood": "description of mood/tone"
 }}
 """
-        
-        try:
-            response = model.generate_content(prompt)
-            
-            # Parse JSON from response
-            import json
-            import re
-            
-            response_text = response.text
-            # Extract JSON from response
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                scene_analysis = json.loads(json_match.group())
-            else:
-                # Fallback if JSON parsing fails
-                scene_analysis = {
-                    "keywords": [scene.get('visual_description', 'news')[:30]],
-                    "media_type": "photo",
-                    "mood": "professional"
-                }
-            
-            enhanced_scene = {
-                **scene,
-                "search_keywords": scene_analysis.get('keywords', []),
-                "media_type": scene_analysis.get('media_type', 'photo'),
-                "mood": scene_analysis.get('mood', 'neutral')
-            }
-            
-            enhanced_scenes.append(enhanced_scene)
-            
-        except Exception as e:
-            print(f"Warning: Failed to analyze scene {scene.get('scene_number')}: {str(e)}")
-            # Fallback with basic keywords
-            enhanced_scenes.append({
-                **scene,
-                "search_keywords": [scene.get('visual_description', 'news')[:30]],
-                "media_type": "photo",
-                "mood": "neutral"
-            })
-    
-    return enhanced_scenes
\ No newline at end of file
+
+    # Parse JSON from response
+    response_text = generate(prompt, dict)
+    # Extract JSON from response
+    if re.search(JSON_PATTERNS[dict], response_text, re.DOTALL):
+        scene_analysis = extract_json(response_text, dict)
+    else:
+        # Fallback if JSON parsing fails
+        scene_analysis = {
+            "keywords": [scene.get('visual_description', 'news')[:30]],
+            "media_type": "photo",
+            "mood": "professional"
+        }
+
+    return _enhance_scene(scene, scene_analysis)
+
+
+def extract_json(response_text, expected):
+    """
+    The JSON object (`expected` dict) or array (list) in a Gemini response,
+    raising when there is none or it does not parse
+    """
+    kind = 'object' if expected is dict else 'array'
+    json_match = re.search(JSON_PATTERNS[expected], response_text, re.DOTALL)
+    if not json_match:
+        raise Exception(f"No JSON {kind} in response")
+    value = json.loads(json_match.group())
+    if not isinstance(value, expected):
+        raise Exception(f"Response is not a JSON {kind}")
+    return value
+
+
+def _enhance_scene(scene, scene_analysis):
+    return {
+        **scene,
+        "search_keywords": scene_analysis.get('keywords', []),
+        "media_type": scene_analysis.get('media_type', 'photo'),
+        "mood": scene_analysis.get('mood', 'neutral')
+    }
+
+
+def _fallback_scene(scene, error):
+    print(f"Warning: Failed to analyze scene {scene.get('scene_number')}: {str(error)}")
+    # Fallback with basic keywords
+    return {
+        **scene,
+        "search_keywords": [scene.get('visual_description', 'news')[:30]],
+        "media_type": "photo",
+        "mood": "neutral"
+    }
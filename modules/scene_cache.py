@@ -0,0 +1,56 @@
+import hashlib
+import json
+import os
+from modules.captions import CAPTION_FONT_SIZE, CAPTION_WIDTH, LINE_SPACING, MAX_CAPTION_CHARS, STROKE_WIDTH
+from modules.disk_cache import shared_cache
+from modules.fonts import font_path
+from modules.media_cache import file_sha256
+
+# Bump whenever the render engine output changes so stale segments are not reused
+RENDER_VERSION = 3
+
+
+def scene_key(spec, size, fps, settings):
+    """
+    Hash of everything that affects the encoded segment of a scene
+    """
+    identity = {
+        'media': file_sha256(spec['path']),
+        'type': spec['type'],
+        'caption': spec.get('caption', ''),
+        'duration': round(spec['duration'], 3),
+        'zoom': spec.get('zoom', 0),
+        'size': list(size),
+        'fps': fps,
+        'preset': settings.get('preset'),
+        'crf': settings.get('crf'),
+        'caption_style': caption_style(),
+        'version': RENDER_VERSION,
+    }
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def caption_style():
+    """
+    The resolved caption font and styling, so a new FONT_PATH or installed
+    font invalidates segments without a RENDER_VERSION bump
+    """
+    path = font_path()
+    return {
+        'font': path,
+        # Names Pillow finds on its own search path have no size here
+        'font_bytes': os.path.getsize(path) if path and os.path.isfile(path) else None,
+        'font_size': CAPTION_FONT_SIZE,
+        'width': CAPTION_WIDTH,
+        'stroke': STROKE_WIDTH,
+        'line_spacing': LINE_SPACING,
+        'max_chars': MAX_CAPTION_CHARS,
+    }
+
+
+def get_scene_cache():
+    """
+    Process-wide cache of encoded scene segments, or None when
+    SCENE_CACHE_ENABLED is off
+    """
+    return shared_cache('SCENE', 'scenes', 2048)
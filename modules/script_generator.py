@@ -1,17 +1,30 @@
-import os
-from groq import Groq
 import json
+from modules.clients import get_groq_client
+from modules.llm_cache import deterministic_default, memoized
+from modules.metrics import external_call
 
-def generate_script(article):
+SCRIPT_MODEL = "llama-3.3-70b-versatile"
+SYSTEM_PROMPT = "You are a professional video script writer who creates engaging, concise scripts for social media videos. Always respond with valid JSON."
+
+def parse_script(content):
+    """
+    Script JSON from a model response, raising unless it has a non-empty list of scenes
+    """
+    script_data = json.loads(content)
+    scenes = script_data.get('scenes') if isinstance(script_data, dict) else None
+    if not scenes or not isinstance(scenes, list) or not all(isinstance(scene, dict) for scene in scenes):
+        raise Exception("No scenes generated in script")
+    return script_data
+
+
+def generate_script(article, deterministic=None):
     """
     Generate a 30-60 second video script using GROQ API
+    deterministic: sample at temperature 0 and reuse the cached response for
+    an identical prompt (defaults to LLM_DETERMINISTIC)
     """
-    api_key = os.getenv('GROQ_API_KEY')
-    
-    if not api_key:
-        raise Exception("GROQ_API_KEY not found in environment variables")
-    
-    client = Groq(api_key=api_key)
+    # Shared client, so its connection pool is reused across jobs
+    client = get_groq_client()
     
     # Create prompt for script generation
     prompt = f"""
@@ -51,28 +64,41 @@ Format your response as JSON:
         # - mixtral-8x7b-32768
         # - gemma2-9b-it
         
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",  # Correct model name
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a professional video script writer who creates engaging, concise scripts for social media videos. Always respond with valid JSON."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.7,
-            max_tokens=1024,
-            response_format={"type": "json_object"}
-        )
+        if deterministic is None:
+            deterministic = deterministic_default()
+        
+        params = {
+            'temperature': 0 if deterministic else 0.7,
+            'max_tokens': 1024,
+            'response_format': {"type": "json_object"}
+        }
+        
+        def complete():
+            with external_call('groq'):
+                completion = client.chat.completions.create(
+                    model=SCRIPT_MODEL,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": SYSTEM_PROMPT
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    **params
+                )
+            return completion.choices[0].message.content
         
-        script_data = json.loads(completion.choices[0].message.content)
+        if deterministic:
+            # Same article, same prompt: skip the round-trip entirely
+            # Only a usable script is memoized, so a bad response is retried next time
+            content = memoized(SCRIPT_MODEL, SYSTEM_PROMPT + prompt, params, complete, validate=parse_script)
+        else:
+            content = complete()
         
-        # Validate and fix script data if needed
-        if not script_data.get('scenes'):
-            raise Exception("No scenes generated in script")
+        script_data = parse_script(content)
         
         # Ensure scene numbers are set
         for i, scene in enumerate(script_data['scenes']):
@@ -0,0 +1,153 @@
+import multiprocessing
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from moviepy.config import get_setting
+from modules.render_engine import SceneRenderer
+from modules.encoder import FFmpegPipeEncoder
+from modules.media_cache import place_file
+from modules.scene_cache import get_scene_cache, scene_key
+from modules.metrics import record_scene_render
+
+RENDER_MODES = ('stream', 'segments')
+DEFAULT_RENDER_MODE = 'stream'
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def render_processes():
+    """
+    Size of the shared render process pool (RENDER_PROCESSES, default one per core)
+    """
+    return max(1, int(os.getenv('RENDER_PROCESSES', os.cpu_count() or 1)))
+
+
+def render_mode():
+    """
+    RENDER_MODE: 'stream' (default) pipes every frame into one bounded-memory
+    encode; 'segments' renders scenes in parallel processes and reuses
+    unchanged scenes from the scene cache
+    """
+    mode = os.getenv('RENDER_MODE', DEFAULT_RENDER_MODE).lower()
+    if mode not in RENDER_MODES:
+        raise Exception(f"Unknown RENDER_MODE '{mode}', expected one of {', '.join(RENDER_MODES)}")
+    return mode
+
+
+def uses_segments():
+    """
+    Whether renders go through parallel segments rather than one streamed encode
+    The scene cache is only consulted and filled in segments mode
+    """
+    return render_mode() == 'segments'
+
+
+def get_render_pool():
+    """
+    Process pool shared by every job, so concurrent jobs queue their scenes
+    on the same set of cores instead of oversubscribing them
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned, not forked: a fork of this multi-threaded process could
+            # inherit a lock (e.g. fonts.font_lock) held by another thread
+            _pool = ProcessPoolExecutor(
+                max_workers=render_processes(),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _pool
+
+
+def render_segment(spec, size, fps, output_path, settings):
+    """
+    Render one scene to its own video-only segment (runs in a worker process)
+    Returns (output_path, seconds) since metrics recorded here would stay in the worker
+    """
+    started = time.perf_counter()
+    renderer = SceneRenderer(spec, size, fps)
+    try:
+        with FFmpegPipeEncoder(output_path, size, fps, **settings) as encoder:
+            encoder.write_frames(renderer.frames())
+    finally:
+        renderer.close()
+    return output_path, time.perf_counter() - started
+
+
+def render_segments(specs, size, fps, segment_folder, settings, on_segment=None):
+    """
+    Render every scene in parallel and return the segment paths in scene order
+    Scenes whose encoded segment is already in the scene cache are not rendered again
+    on_segment: optional callback(spec) once a scene's segment is ready
+    """
+    if not specs:
+        return []
+    os.makedirs(segment_folder, exist_ok=True)
+
+    # Each segment gets a share of the cores unless a thread count was set;
+    # at least one even with more render processes than cores
+    settings = dict(settings)
+    if not settings.get('threads'):
+        settings['threads'] = max(1, (os.cpu_count() or 1) // max(1, min(render_processes(), len(specs))))
+
+    cache = get_scene_cache()
+    pool = get_render_pool()
+    segment_paths = []
+    pending = []
+
+    for spec in specs:
+        segment_path = os.path.join(segment_folder, f"segment_{spec['index']:03d}.mp4")
+        segment_paths.append(segment_path)
+
+        key = scene_key(spec, size, fps, settings) if cache else None
+        cached_path = cache.get(key) if cache else None
+        if cached_path:
+            print(f"Scene {spec['index']}: Reusing cached segment")
+            place_file(cached_path, segment_path)
+            record_scene_render(spec['index'], 0.0, 'segments', cached=True)
+            if on_segment:
+                on_segment(spec)
+            continue
+
+        future = pool.submit(render_segment, spec, size, fps, segment_path, settings)
+        pending.append((spec, key, future))
+
+    # Only scenes that changed are re-encoded; store them for next time
+    for spec, key, future in pending:
+        segment_path, seconds = future.result()
+        record_scene_render(spec['index'], seconds, 'segments')
+        if cache:
+            cache.put_file(key, segment_path, suffix='.mp4')
+        if on_segment:
+            on_segment(spec)
+
+    return segment_paths
+
+
+def concat_segments(segment_paths, audio_path, output_path, list_path):
+    """
+    Join segments without re-encoding and mux the voiceover once
+    """
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    cmd = [
+        get_setting('FFMPEG_BINARY'), '-y', '-loglevel', 'error',
+        '-f', 'concat', '-safe', '0', '-i', list_path,
+    ]
+    if audio_path:
+        cmd += ['-i', audio_path, '-map', '0:v', '-map', '1:a', '-c:a', 'aac', '-shortest']
+    cmd += ['-c:v', 'copy', '-movflags', '+faststart', output_path]
+
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        error = result.stderr.decode('utf-8', errors='replace').strip()[-2000:]
+        raise Exception(f"ffmpeg concat failed with code {result.returncode}: {error}")
+    return output_path
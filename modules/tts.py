@@ -0,0 +1,141 @@
+import hashlib
+import os
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from moviepy.config import get_setting
+from moviepy.editor import AudioFileClip
+from modules.disk_cache import shared_cache
+from modules.media_cache import place_file
+from modules.metrics import bind, external_call
+from modules.clients import speech_engine
+
+LANGUAGE = 'en'
+# Scenes without narration still get a short silent beat
+SILENT_SCENE_DURATION = 2.0
+
+
+def get_tts_cache():
+    """
+    Process-wide cache of synthesized sentences, or None when TTS_CACHE_ENABLED is off
+    """
+    return shared_cache('TTS', 'tts', 256)
+
+
+def split_sentences(text):
+    return [sentence for sentence in re.split(r'(?<=[.!?])\s+', text.strip()) if sentence]
+
+
+def sentence_key(sentence, lang=LANGUAGE):
+    normalized = ' '.join(sentence.split())
+    return hashlib.sha256(f'{lang}|{normalized}'.encode('utf-8')).hexdigest()
+
+
+def audio_duration(path):
+    clip = AudioFileClip(path)
+    try:
+        return clip.duration
+    finally:
+        clip.close()
+
+
+def synthesize_sentence(sentence, temp_folder, lang=LANGUAGE):
+    """
+    Speech for one sentence, from the cache when it was spoken before
+    Returns (path, duration); the path is in `temp_folder` and only linked
+    into the cache, so cache evictions cannot delete it before the voiceover is stitched
+    """
+    key = sentence_key(sentence, lang)
+    cache = get_tts_cache()
+    path = os.path.join(temp_folder, f'tts_{key[:16]}.mp3')
+
+    if cache:
+        cached_path = cache.get(key)
+        if cached_path:
+            meta = cache.get_meta(key) or {}
+            duration = meta.get('duration') or audio_duration(cached_path)
+            return place_file(cached_path, path), duration
+
+    with external_call('gtts'):
+        speech_engine()(text=sentence, lang=lang, slow=False).save(path)
+    duration = audio_duration(path)
+
+    if cache:
+        cache.put_file(key, path, suffix='.mp3', meta={'duration': duration}, link=True)
+    return path, duration
+
+
+def synthesize_narration(script_data, scenes, audio_path, temp_folder, max_workers=None, spoken=None):
+    """
+    Synthesize each scene's narration concurrently, sentence by sentence,
+    and stitch it into one voiceover at `audio_path`
+    spoken: optional {sentence: (path, duration)} synthesized earlier, reused as is
+
+    Returns the real spoken duration of every scene, or None when the scenes
+    have no narration and the whole script was spoken as one piece
+    """
+    scene_sentences = [split_sentences(scene.get('narration', '')) for scene in scenes]
+
+    if not any(scene_sentences):
+        # No per-scene narration to time against: speak the whole script
+        with external_call('gtts'):
+            speech_engine()(text=script_data.get('script_text', ''), lang=LANGUAGE, slow=False).save(audio_path)
+        return None
+
+    # Every distinct sentence is synthesized once, all of them in parallel
+    spoken = dict(spoken or {})
+    unique_sentences = [
+        s for s in dict.fromkeys(s for sentences in scene_sentences for s in sentences) if s not in spoken
+    ]
+    if unique_sentences:
+        max_workers = max(1, min(max_workers or int(os.getenv('TTS_CONCURRENCY', 4)), len(unique_sentences)))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tts') as executor:
+            spoken.update(zip(
+                unique_sentences,
+                executor.map(bind(lambda sentence: synthesize_sentence(sentence, temp_folder)), unique_sentences)
+            ))
+
+    parts = []
+    durations = []
+    for idx, sentences in enumerate(scene_sentences):
+        if sentences:
+            parts.extend(spoken[sentence][0] for sentence in sentences)
+            durations.append(sum(spoken[sentence][1] for sentence in sentences))
+        else:
+            silence_path = os.path.join(temp_folder, f'silence_{idx}.mp3')
+            parts.append(make_silence(silence_path, SILENT_SCENE_DURATION))
+            durations.append(SILENT_SCENE_DURATION)
+
+    stitch_audio(parts, audio_path, os.path.join(temp_folder, 'voiceover.txt'))
+    return durations
+
+
+def make_silence(path, duration):
+    cmd = [
+        get_setting('FFMPEG_BINARY'), '-y', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', 'anullsrc=r=24000:cl=mono', '-t', f'{duration:.3f}',
+        '-c:a', 'libmp3lame', '-q:a', '4', path
+    ]
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return path
+
+
+def stitch_audio(parts, output_path, list_path):
+    """
+    Join audio files back to back into one track
+    """
+    with open(list_path, 'w', encoding='utf-8') as f:
+        for path in parts:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    cmd = [
+        get_setting('FFMPEG_BINARY'), '-y', '-loglevel', 'error',
+        '-f', 'concat', '-safe', '0', '-i', list_path,
+        '-c:a', 'libmp3lame', '-q:a', '4', output_path
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        error = result.stderr.decode('utf-8', errors='replace').strip()[-2000:]
+        raise Exception(f"Failed to stitch voiceover: {error}")
+    return output_path
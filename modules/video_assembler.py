@@ -1,161 +1,140 @@
 import os
-from moviepy.config import change_settings
+import time
+from PIL import Image, ImageDraw
+from modules.render_engine import KEN_BURNS_ZOOM, SceneRenderer, scene_frame_count
+from modules.encoder import FFmpegPipeEncoder, encoder_settings
+from modules.segment_renderer import render_segments, concat_segments, uses_segments
+from modules.render_profiles import get_profile
+from modules.fonts import font_lock, get_font
+from modules.tts import audio_duration, synthesize_narration
+from modules.progress import RenderProgress
+from modules.metrics import record_scene_render
+from modules.video_proxy import extract_still, prepare_video_proxies
 
-
-IMAGEMAGICK_PATH = r"C:\Program Files\ImageMagick-7.1.2-Q16-HDRI\magick.exe"
-
-if os.path.exists(IMAGEMAGICK_PATH):
-    change_settings({"IMAGEMAGICK_BINARY": IMAGEMAGICK_PATH})
-else:
-    print(f"⚠️ Warning: ImageMagick not found at {IMAGEMAGICK_PATH}. Text overlays might fail.")
-
-
-from moviepy.editor import *
-from PIL import Image, ImageDraw, ImageFont
-import numpy as np
-
-
-import PIL.Image
-if not hasattr(PIL.Image, 'ANTIALIAS'):
-    PIL.Image.ANTIALIAS = PIL.Image.LANCZOS
-
-
-from gtts import gTTS
-
-def create_video(script_data, scenes, media_files, output_path):
+def create_video(script_data, scenes, media_files, output_path, workspace=None, size=None,
+                 audio_path=None, scene_durations=None, on_progress=None, profile=None, static=False):
     """
-    Assemble the final video using MoviePy
+    Assemble the final video and encode it with ffmpeg
+    workspace: job Workspace for the voiceover and intermediate files
+    size: output (width, height), overrides the profile's size
+    audio_path: voiceover that was already synthesized, skips TTS
+    scene_durations: spoken length of each scene in that voiceover
+    on_progress: optional callback(event_type, **data) for render_progress events
+    profile: render profile from render_profiles.get_profile, defaults to RENDER_PROFILE
+    static: show every scene as a still frame, without the Ken Burns zoom;
+    video scenes hold their first frame, so no clip is transcoded or decoded
     """
-    clips = []
-    temp_folder = 'temp'
+    temp_folder = workspace.path if workspace else 'temp'
     
     # Ensure temp folder exists
     os.makedirs(temp_folder, exist_ok=True)
     
-    # Generate voiceover
-    script_text = script_data.get('script_text', '')
-    audio_path = f'{temp_folder}/voiceover.mp3'
+    # Generate voiceover, one narration per scene
+    if audio_path is None:
+        audio_path = f'{temp_folder}/voiceover.mp3'
+        try:
+            scene_durations = synthesize_narration(script_data, scenes, audio_path, temp_folder)
+        except Exception as e:
+            print(f"Error generating TTS: {e}")
+            return
+    
+    num_scenes = len(scenes)
+    if not scene_durations or len(scene_durations) != num_scenes:
+        # No per-scene timing: split the whole voiceover evenly
+        try:
+            total_duration = audio_duration(audio_path)
+        except OSError:
+            print("Error loading audio file.")
+            return
+        duration_per_scene = total_duration / num_scenes if num_scenes > 0 else 5
+        scene_durations = [duration_per_scene] * num_scenes
+    
+    # Frames are streamed to ffmpeg one at a time, so memory no longer grows
+    # with resolution and 1080p is safe (the 'hd' profile)
+    profile = profile or get_profile()
+    target_size = size or profile['size']
+    fps = profile['fps']
+    settings = dict(encoder_settings(), preset=profile['preset'], crf=profile['crf'])
+    
+    specs = build_scene_specs(scenes, media_files, scene_durations, temp_folder, static=static)
+    # Video scenes are decoded from small proxies at the output size, fps and
+    # scene length; static renders have none left, they were turned into stills
+    prepare_video_proxies(specs, target_size, fps, temp_folder)
+    
+    progress = RenderProgress(sum(scene_frame_count(spec, fps) for spec in specs), on_progress)
     
     try:
-        tts = gTTS(text=script_text, lang='en', slow=False)
-        tts.save(audio_path)
+        if uses_segments():
+            # Encode scenes in parallel processes (skipping scenes that are
+            # already in the scene cache), then join them losslessly
+            segment_paths = render_segments(
+                specs, target_size, fps, f'{temp_folder}/segments', settings,
+                on_segment=lambda spec: progress.advance(scene_frame_count(spec, fps))
+            )
+            concat_segments(segment_paths, audio_path, output_path, f'{temp_folder}/segments.txt')
+        else:
+            with FFmpegPipeEncoder(output_path, target_size, fps, audio_path=audio_path,
+                                   on_frame=lambda frames: progress.advance(), **settings) as encoder:
+                # Only one scene's source image is held in memory at a time
+                for spec in specs:
+                    started = time.perf_counter()
+                    renderer = SceneRenderer(spec, target_size, fps)
+                    try:
+                        encoder.write_frames(renderer.frames())
+                    finally:
+                        renderer.close()
+                    record_scene_render(spec['index'], time.perf_counter() - started, 'stream')
+        
+        print(f"Video created successfully: {output_path}")
+        
     except Exception as e:
-        print(f"Error generating TTS: {e}")
-        return
+        print(f"Error assembling video: {e}")
 
-    # Load audio to get duration
-    try:
-        audio_clip = AudioFileClip(audio_path)
-        total_duration = audio_clip.duration
-    except OSError:
-        print("Error loading audio file.")
-        return
-    
-    # Calculate duration per scene
-    num_scenes = len(scenes)
-    duration_per_scene = total_duration / num_scenes if num_scenes > 0 else 5
-    
-    # Target resolution (720p to save memory)
-    # 1080p (1920x1080) requires 2x more RAM and often causes "Unable to allocate" errors
-    TARGET_SIZE = (1280, 720)
+
+def build_scene_specs(scenes, media_files, durations, temp_folder, static=False):
+    """
+    Describe what each scene shows as plain data for the render engine
+    """
+    specs = []
     
     for idx, scene in enumerate(scenes):
         # Find corresponding media file
         media = next((m for m in media_files if m['scene_number'] == scene.get('scene_number')), None)
         
-        img_clip = None
+        if media and media['path'] and media['type'] == 'video' and static:
+            # A still render only needs one frame of the clip
+            try:
+                media = dict(media, path=extract_still(media['path'], f'{temp_folder}/still_{idx}.jpg'), type='image')
+            except Exception as e:
+                print(f"Scene {idx}: Using a placeholder, {str(e)}")
+                media = None
         
         if media and media['path'] and media['type'] in ['image', 'video']:
-            if media['type'] == 'image':
-                # Create clip from image
-                img_clip = ImageClip(media['path']).set_duration(duration_per_scene)
-                
-                # Resize to cover 720p height
-                img_clip = img_clip.resize(height=720) 
-                img_clip = img_clip.margin(left=0, top=0, opacity=0).set_position("center")
-                
-                # Add zoom effect (Ken Burns)
-                # Reduced zoom factor slightly to save processing time
-                img_clip = img_clip.resize(lambda t: 1 + 0.02 * t / duration_per_scene)
-                
-            else:  # video
-                video_clip = VideoFileClip(media['path'])
-                
-                # Resize video to standard height
-                video_clip = video_clip.resize(height=720)
-                
-                # Loop or trim video to match scene duration
-                if video_clip.duration < duration_per_scene:
-                    video_clip = video_clip.loop(duration=duration_per_scene)
-                else:
-                    video_clip = video_clip.subclip(0, duration_per_scene)
-                img_clip = video_clip
+            spec = {
+                'path': media['path'],
+                'type': media['type'],
+                # Add zoom effect (Ken Burns) to still images
+                'zoom': KEN_BURNS_ZOOM if media['type'] == 'image' and not static else 0
+            }
         else:
             # Create placeholder with text using PIL if no media found
-            img_clip = create_text_clip(
-                scene.get('narration', 'Scene ' + str(idx + 1)),
-                duration_per_scene
-            )
+            spec = {
+                'path': create_placeholder_image(
+                    scene.get('narration', 'Scene ' + str(idx + 1)),
+                    f'{temp_folder}/placeholder_{idx}.jpg'
+                ),
+                'type': 'image',
+                'zoom': 0
+            }
         
-        # Ensure the clip is exactly the target size (centers it on black background if aspect ratio differs)
-        img_clip = CompositeVideoClip([img_clip.set_position("center")], size=TARGET_SIZE)
-
-        # Create Text Overlay (Captions)
-        try:
-            txt_clip = TextClip(
-                scene.get('narration', '')[:100],  # Limit text length
-                font='Arial',
-                fontsize=40,  # Slightly smaller font for 720p
-                color='white',
-                stroke_color='black',
-                stroke_width=2,
-                size=(1100, None), # Wrap text (adjusted for 720p width)
-                method='caption'
-            ).set_duration(duration_per_scene).set_position(('center', 0.8), relative=True) # Position at bottom 80%
-            
-            # Composite video and text
-            # We use 'use_bg_clip=True' to optimize composition
-            composite = CompositeVideoClip([img_clip, txt_clip], size=TARGET_SIZE)
-        except Exception as e:
-            print(f"MoviePy TextClip error (likely font/imagemagick issue): {e}")
-            composite = img_clip
-            
-        clips.append(composite)
+        spec['index'] = idx
+        spec['duration'] = durations[idx]
+        spec['caption'] = scene.get('narration', '')
+        specs.append(spec)
     
-    # Concatenate all clips
-    try:
-        # MEMORY FIX: Removed method='compose'. 
-        # Default chaining uses much less RAM than composing everything at once.
-        final_video = concatenate_videoclips(clips)
-        
-        # Add audio
-        final_video = final_video.set_audio(audio_clip)
-        
-        # Write output
-        final_video.write_videofile(
-            output_path,
-            fps=24,
-            codec='libx264',
-            audio_codec='aac',
-            temp_audiofile=f'{temp_folder}/temp-audio.m4a',
-            remove_temp=True,
-            verbose=False,
-            # threads=1 # Uncomment if memory errors persist (slower but safer)
-        )
-        
-        print(f"Video created successfully: {output_path}")
-        
-    except Exception as e:
-        print(f"Error assembling video: {e}")
-    finally:
-        # Cleanup
-        try:
-            audio_clip.close()
-            final_video.close()
-        except:
-            pass
+    return specs
 
-def create_text_clip(text, duration):
+def create_placeholder_image(text, temp_path='temp/placeholder.jpg'):
     """
     Create a simple colored background with text using PIL (Fallback if media fails)
     """
@@ -163,29 +142,22 @@ def create_text_clip(text, duration):
     img = Image.new('RGB', (1280, 720), color=(30, 30, 50))
     draw = ImageDraw.Draw(img)
     
-    # Try to load a font, fallback to default
-    try:
-        font = ImageFont.truetype("arial.ttf", 50)
-    except:
-        font = ImageFont.load_default()
+    # Font is resolved once per process
+    font = get_font(50)
     
     # Add text (Basic centering)
     text_wrapped = text[:100]  # Limit text
     
     # Get text size
-    try:
+    with font_lock:
         bbox = draw.textbbox((0, 0), text_wrapped, font=font)
         text_width = bbox[2] - bbox[0]
         text_height = bbox[3] - bbox[1]
-    except AttributeError:
-        # Older PIL versions
-        text_width, text_height = draw.textsize(text_wrapped, font=font)
-    
-    position = ((1280 - text_width) // 2, (720 - text_height) // 2)
-    draw.text(position, text_wrapped, fill='white', font=font)
+        
+        position = ((1280 - text_width) // 2, (720 - text_height) // 2)
+        draw.text(position, text_wrapped, fill='white', font=font)
     
     # Save temporary image
-    temp_path = 'temp/placeholder.jpg'
     img.save(temp_path)
     
-    return ImageClip(temp_path).set_duration(duration)
\ No newline at end of file
+    return temp_path
\ No newline at end of file
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from moviepy.config import get_setting
+from modules.disk_cache import shared_cache
+from modules.media_cache import file_sha256, place_file
+from modules.metrics import bind
+
+# Proxies are intermediate files, so they are encoded near-losslessly and fast
+PROXY_PRESET = 'veryfast'
+PROXY_CRF = 16
+# Bump whenever the proxy encoding changes so stale proxies are not reused
+PROXY_VERSION = 1
+
+
+def get_proxy_cache():
+    """
+    Process-wide cache of transcoded video proxies, or None when
+    VIDEO_PROXY_CACHE_ENABLED is off
+    """
+    return shared_cache('VIDEO_PROXY', 'proxies', 1024)
+
+
+def proxy_key(source_path, duration, size, fps):
+    identity = {
+        'source': file_sha256(source_path),
+        'duration': round(duration, 3),
+        'size': list(size),
+        'fps': fps,
+        'version': PROXY_VERSION,
+    }
+    return hashlib.sha256(json.dumps(identity, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def transcode_proxy(source_path, output_path, duration, size, fps):
+    """
+    Re-encode a clip to exactly `duration` seconds at `size` and `fps`:
+    looped when shorter, trimmed when longer, scaled to cover the frame and
+    center-cropped, without audio
+    """
+    width, height = size
+    cmd = [
+        get_setting('FFMPEG_BINARY'), '-y', '-loglevel', 'error',
+        '-stream_loop', '-1', '-i', source_path,
+        '-t', f'{duration:.3f}', '-an',
+        '-vf', (
+            f'scale={width}:{height}:force_original_aspect_ratio=increase,'
+            f'crop={width}:{height},fps={fps},format=yuv420p'
+        ),
+        '-c:v', 'libx264', '-preset', PROXY_PRESET, '-crf', str(PROXY_CRF),
+        output_path
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        error = result.stderr.decode('utf-8', errors='replace').strip()[-2000:]
+        raise Exception(f"Failed to transcode video proxy: {error}")
+    return output_path
+
+
+def extract_still(source_path, output_path):
+    """
+    Save the first frame of a clip as an image, for renders that hold every scene still
+    """
+    cmd = [
+        get_setting('FFMPEG_BINARY'), '-y', '-loglevel', 'error',
+        '-i', source_path, '-frames:v', '1', '-q:v', '2',
+        output_path
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0 or not os.path.exists(output_path):
+        error = result.stderr.decode('utf-8', errors='replace').strip()[-2000:]
+        raise Exception(f"Failed to extract a still frame: {error}")
+    return output_path
+
+
+def video_proxy(source_path, duration, size, fps, temp_folder):
+    """
+    Path of a proxy of `source_path` ready to be decoded frame by frame,
+    transcoded once and then served from the proxy cache
+    The proxy lives in `temp_folder` and is only linked to the cache entry,
+    so evicting it from the cache cannot delete it while a render reads it
+    """
+    key = proxy_key(source_path, duration, size, fps)
+    cache = get_proxy_cache()
+    output_path = os.path.join(temp_folder, f'proxy_{key[:16]}.mp4')
+
+    if cache:
+        cached_path = cache.get(key)
+        if cached_path:
+            return place_file(cached_path, output_path)
+
+    transcode_proxy(source_path, output_path, duration, size, fps)
+
+    if cache:
+        cache.put_file(key, output_path, suffix='.mp4', link=True)
+    return output_path
+
+
+def prepare_video_proxies(specs, size, fps, temp_folder, max_workers=None):
+    """
+    Point every video scene spec at a proxy with the scene's duration,
+    the output size and fps; scenes whose proxy fails keep the original
+    """
+    videos = [spec for spec in specs if spec['type'] == 'video']
+    if not videos:
+        return specs
+
+    def prepare(spec):
+        try:
+            spec['path'] = video_proxy(spec['path'], spec['duration'], size, fps, temp_folder)
+            spec['proxy'] = True
+        except Exception as e:
+            print(f"Scene {spec['index']}: Using the original clip, {str(e)}")
+
+    max_workers = max(1, min(max_workers or int(os.getenv('VIDEO_PROXY_CONCURRENCY', 2)), len(videos)))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='video-proxy') as executor:
+        list(executor.map(bind(prepare), videos))
+    return specs
@@ -0,0 +1,75 @@
+import os
+import shutil
+import time
+import uuid
+
+# When to keep a job's files after it finishes: never, failed or always
+RETENTION_POLICIES = ('never', 'failed', 'always')
+# Written into workspaces kept for a limited time, holds the expiry timestamp
+KEEP_UNTIL_FILE = '.keep_until'
+
+
+class Workspace:
+    """
+    Job-scoped scratch folder so concurrent jobs never share temp files.
+
+    Use as a context manager: the folder is created on entry and removed on
+    exit unless the retention policy (KEEP_WORKSPACES) says to keep it.
+    """
+
+    def __init__(self, root='temp', job_id=None, retention=None):
+        self.job_id = job_id or uuid.uuid4().hex
+        self.path = os.path.join(root, self.job_id)
+        self.retention = retention or os.getenv('KEEP_WORKSPACES', 'never').lower()
+        if self.retention not in RETENTION_POLICIES:
+            raise Exception(f"Unknown workspace retention policy: {self.retention}")
+
+    def file(self, name):
+        """
+        Path of a file inside the workspace
+        """
+        return os.path.join(self.path, name)
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def keep_until(self, timestamp):
+        """
+        Keep the workspace after exit until `timestamp`, when sweep() removes it
+        """
+        self.retention = 'always'
+        with open(self.file(KEEP_UNTIL_FILE), 'w', encoding='utf-8') as f:
+            f.write(str(timestamp))
+
+    @staticmethod
+    def sweep(root='temp'):
+        """
+        Remove kept workspaces under `root` whose keep_until time has passed
+        """
+        if not os.path.isdir(root):
+            return 0
+        removed = 0
+        now = time.time()
+        for name in os.listdir(root):
+            marker = os.path.join(root, name, KEEP_UNTIL_FILE)
+            try:
+                with open(marker, encoding='utf-8') as f:
+                    expires_at = float(f.read().strip())
+            except (OSError, ValueError):
+                continue
+            if expires_at < now:
+                shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+                removed += 1
+        return removed
+
+    def __enter__(self):
+        os.makedirs(self.path, exist_ok=True)
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        failed = exc_type is not None
+        if self.retention == 'always' or (self.retention == 'failed' and failed):
+            print(f"Keeping workspace {self.path}")
+        else:
+            self.cleanup()
+        return False